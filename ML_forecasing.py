@@ -3,16 +3,13 @@ from datetime import date
 
 
 import pandas as pd
-import yfinance as yf
-from prophet import Prophet
-from prophet.plot import plot_plotly
+import market_data
+from ohlcv_store import OHLCVStore
+from model_registry import ModelRegistry, PROPHET_PARAMS
 from plotly import graph_objs as go
 from plotly.subplots import make_subplots
 import plotly as px
-from prophet.plot import add_changepoints_to_plot
-from prophet.diagnostics import cross_validation
-from prophet.diagnostics import performance_metrics
-from prophet.plot import plot_cross_validation_metric
+from cv_jobs import CrossValidationRunner
 
 
 
@@ -48,7 +45,14 @@ period = n_years* 365
 
 @st.cache_data
 def load_data(ticker):
-    data = yf.download(ticker, START, TODAY)
+    # Daily bars are kept in the shared on-disk store; only bars newer than
+    # the last stored one are downloaded.
+    store = OHLCVStore()
+    try:
+        store.update(market_data.get_provider(), [ticker], "1d", START, TODAY)
+    except Exception as e:
+        st.warning(f"Could not refresh market data, using stored bars: {e}")
+    data = store.read_frame(ticker, "1d", start=START)
     data.reset_index(inplace=True)
     return data
 
@@ -104,10 +108,27 @@ plot_candle_data()
 df_train = data[['Date','Close']]
 df_train = df_train.rename(columns={"Date": "ds", "Close": "y"})
 
-m = Prophet(interval_width=0.95)
-m.fit(df_train)
-future = m.make_future_dataframe(periods=period,freq = 'D')
-forecast = m.predict(future)
+@st.cache_resource
+def load_registry():
+    return ModelRegistry()
+
+
+@st.cache_resource(show_spinner="Fitting model...")
+def load_model(ticker, df_train):
+    # Reuses the fitted model across reruns (e.g. moving the slider) and
+    # across sessions via the on-disk registry
+    m, key = load_registry().get_or_fit(ticker, df_train, PROPHET_PARAMS)
+    return m, key
+
+
+@st.cache_data
+def predict(_m, model_key, period):
+    future = _m.make_future_dataframe(periods=period,freq = 'D')
+    return _m.predict(future)
+
+
+m, model_key = load_model(selected_stock, df_train)
+forecast = predict(m, model_key, period)
 
 # Show and plot forecast
 st.subheader('3.Forecast data 🔮')
@@ -116,6 +137,9 @@ st.write("Load a time series to activate it.")
 st.write(forecast.tail())
     
 st.write(f'Forecast plot for {n_years} years')
+# prophet.plot pulls in matplotlib; import it once the model is ready
+from prophet.plot import plot_plotly, add_changepoints_to_plot, plot_cross_validation_metric
+
 fig1 = plot_plotly(m, forecast)
 st.plotly_chart(fig1)
 
@@ -154,11 +178,26 @@ with st.expander("Cross validation"):
             horizon = st.number_input(value= 90, label="horizon",min_value=30,max_value=366)
             horizon = str(horizon) + " days"
             
+@st.cache_resource
+def load_cv_runner():
+    return CrossValidationRunner()
+
+
 with st.expander("Metrics"):
     
     
-    df_cv = cross_validation(m, initial='1000 days', period='90 days', horizon = '365 days')
-    df_p= performance_metrics(df_cv)
+    # Cross-validation runs in the background across a process pool; results
+    # are cached per (model, initial, period, horizon)
+    cv_job = load_cv_runner().submit(m, model_key, initial, period, horizon)
+    if not cv_job.done.is_set():
+        st.progress(cv_job.progress, text=f"Cross-validating... {cv_job.completed}/{cv_job.total} cutoffs")
+        st.button("Refresh")
+        st.stop()
+    if cv_job.error is not None:
+        st.error(f"Cross-validation failed: {cv_job.error}")
+        st.stop()
+    df_cv = cv_job.df_cv
+    df_p = cv_job.df_p
     
     #st.write(df_p)
     
@@ -0,0 +1,127 @@
+import math
+
+from sqlalchemy import text
+
+SORTS = ("id", "funds", "value")
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+LEADERBOARD_SIZE = 100
+
+# Holdings without a quote are carried at their FIFO cost basis, as in
+# valuation.mark_to_market
+_VALUE = "COALESCE(SUM(COALESCE(h.quantity * p.price, h.cost_basis)), 0.0)"
+
+# sort -> (keyset condition, page order, order after the join)
+_KEYSET = {
+    "id": ("WHERE id > :after_id", "id", "u.id"),
+    "funds": ("WHERE (funds, id) < (:after_key, :after_id)", "funds DESC, id DESC", "u.funds DESC, u.id DESC"),
+}
+
+_DELETE_USER = [
+    text("DELETE FROM stock_transaction WHERE user_id = :user_id"),
+    text("DELETE FROM holding WHERE user_id = :user_id"),
+    text('DELETE FROM "user" WHERE id = :user_id'),
+]
+
+
+def _prices_cte(prices):
+    # Latest quotes as an inline table: prices(symbol, price)
+    params = {}
+    rows = []
+    for i, (symbol, price) in enumerate(sorted(prices.items())):
+        params[f"s{i}"] = symbol
+        params[f"p{i}"] = float(price)
+        rows.append(f"(:s{i}, :p{i})")
+    if not rows:
+        return "prices(symbol, price) AS (SELECT NULL, NULL WHERE 0)", params
+    return f"prices(symbol, price) AS (VALUES {', '.join(rows)})", params
+
+
+def parse_cursor(after):
+    """``(key, id)`` from a ``"key:id"`` cursor; raises ValueError if malformed."""
+    key, sep, user_id = after.rpartition(":")
+    if not sep:
+        raise ValueError(f"Malformed cursor '{after}'.")
+    key, user_id = float(key), int(user_id)
+    if not math.isfinite(key):
+        raise ValueError(f"Malformed cursor '{after}'.")
+    return key, user_id
+
+
+def page_users(conn, prices, sort="id", after=None, limit=PAGE_SIZE):
+    """One page of users with their portfolio value, using keyset pagination.
+
+    ``sort`` is ``id`` (ascending), ``funds`` or ``value`` (both descending,
+    ties broken by id). ``after`` is the ``(key, id)`` cursor returned with
+    the previous page (see ``parse_cursor``). Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the
+    last page. Sorting by id or funds only aggregates the page's users;
+    sorting by value has to aggregate everyone in one GROUP BY.
+    """
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort '{sort}'.")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    cte, params = _prices_cte(prices)
+    params["limit"] = limit + 1
+
+    if sort == "value":
+        where = ""
+        if after is not None:
+            where = "WHERE (value, id) < (:after_key, :after_id)"
+            params.update(after_key=float(after[0]), after_id=int(after[1]))
+        sql = (
+            f"WITH {cte}, valued AS ("
+            f'SELECT u.id, u.username, u.funds, {_VALUE} AS value FROM "user" u '
+            "LEFT JOIN holding h ON h.user_id = u.id LEFT JOIN prices p ON p.symbol = h.stock_symbol "
+            "GROUP BY u.id) "
+            f"SELECT id, username, funds, value FROM valued {where} "
+            "ORDER BY value DESC, id DESC LIMIT :limit"
+        )
+    else:
+        where, inner_order, outer_order = _KEYSET[sort]
+        if after is not None:
+            params.update(after_key=float(after[0]), after_id=int(after[1]))
+        else:
+            where = ""
+        sql = (
+            f"WITH {cte}, page AS ("
+            f'SELECT id, username, funds FROM "user" {where} ORDER BY {inner_order} LIMIT :limit) '
+            f"SELECT u.id, u.username, u.funds, {_VALUE} AS value FROM page u "
+            "LEFT JOIN holding h ON h.user_id = u.id LEFT JOIN prices p ON p.symbol = h.stock_symbol "
+            f"GROUP BY u.id ORDER BY {outer_order}"
+        )
+
+    rows = [row._asdict() for row in conn.execute(text(sql), params)]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        key = last["id"] if sort == "id" else last[sort]
+        next_cursor = (key, last["id"])
+    return rows, next_cursor
+
+
+def leaderboard(conn, prices, limit=LEADERBOARD_SIZE):
+    """The ``limit`` users with the highest equity (cash plus market value),
+    in one GROUP BY over the holdings table."""
+    cte, params = _prices_cte(prices)
+    params["limit"] = max(1, min(int(limit), LEADERBOARD_SIZE))
+    sql = (
+        f"WITH {cte}, valued AS ("
+        f'SELECT u.id, u.username, u.funds, {_VALUE} AS market_value FROM "user" u '
+        "LEFT JOIN holding h ON h.user_id = u.id LEFT JOIN prices p ON p.symbol = h.stock_symbol "
+        "GROUP BY u.id) "
+        "SELECT username, funds, market_value, funds + market_value AS equity FROM valued "
+        "ORDER BY equity DESC, id LIMIT :limit"
+    )
+    return [row._asdict() for row in conn.execute(text(sql), params)]
+
+
+def held_symbols(conn):
+    """Symbols with any open position, to know which quotes to fetch."""
+    return [row[0] for row in conn.execute(text("SELECT DISTINCT stock_symbol FROM holding WHERE quantity != 0"))]
+
+
+def delete_user(conn, user_id):
+    """Delete a user with all their transactions and holdings, set-based."""
+    for statement in _DELETE_USER:
+        conn.execute(statement, {"user_id": user_id})
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify  
+from flask import Flask, current_app, render_template, request, redirect, url_for, flash, session, jsonify, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import (
     LoginManager,
@@ -9,24 +9,186 @@ from flask_login import (
     current_user,
 )
 from flask_bcrypt import Bcrypt
-import requests
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
+from werkzeug.local import LocalProxy
 import sqlite3
-import xmltodict
-import yfinance as yf
-from yahoo_fin import stock_info as si
-import plotly.graph_objs as go
-import plotly.io as pio
 import datetime
+import json
+import os
 import re
 import time
 
-app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///trading.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SECRET_KEY"] = "ohyesabhi"
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
-bcrypt = Bcrypt(app)
+import admin_queries
+import batch_forecast
+from http_cache import FragmentCache, ResponseOptimizer
+import indicators
+import lazy_imports
+import market_data
+import matching_engine
+import metrics
+import ohlcv_store
+from market_trends import MarketTrends
+from news_feed import NewsFeed
+import orders
+from password_hasher import HasherBusy, PasswordHasher
+from price_stream import PriceStream, StreamFull
+from quote_cache import QuoteCache
+import risk
+from symbols import STOCK_SYMBOLS
+import valuation
+
+# Heavy modules load on first use so workers boot (and serve /login) without
+# them; warm_up() imports them up front for preforking servers
+pd = lazy_imports.lazy_import("pandas")
+charts = lazy_imports.lazy_import("charts")
+
+
+def load_config():
+    config = {}
+    config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///trading.db")
+    config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    config["SECRET_KEY"] = "ohyesabhi"
+    config["QUOTE_CACHE_TTL"] = int(os.environ.get("QUOTE_CACHE_TTL", 15))
+    config["INTRADAY_CACHE_TTL"] = int(os.environ.get("INTRADAY_CACHE_TTL", 60))
+    config["MARKET_CACHE_SIZE"] = int(os.environ.get("MARKET_CACHE_SIZE", 256))
+    config["MARKET_FETCH_TIMEOUT"] = float(os.environ.get("MARKET_FETCH_TIMEOUT", 5))
+    config["MARKET_DATA_PROVIDER"] = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+    config["MARKET_DATA_REFRESH"] = int(os.environ.get("MARKET_DATA_REFRESH", 60))
+    config["NEWS_FEED_URL"] = os.environ.get("NEWS_FEED_URL", "https://finance.yahoo.com/rss/topstories")
+    config["NEWS_REFRESH"] = int(os.environ.get("NEWS_REFRESH", 300))
+    config["NEWS_TIMEOUT"] = float(os.environ.get("NEWS_TIMEOUT", 5))
+    config["BULK_ORDER_LIMIT"] = int(os.environ.get("BULK_ORDER_LIMIT", 5000))
+    config["MARKET_TRENDS_REFRESH"] = int(os.environ.get("MARKET_TRENDS_REFRESH", 300))
+    config["OHLCV_STORE_DIR"] = os.environ.get("OHLCV_STORE_DIR", ohlcv_store.DEFAULT_ROOT)
+    config["STREAM_POLL_INTERVAL"] = float(os.environ.get("STREAM_POLL_INTERVAL", 2))
+    config["STREAM_QUEUE_SIZE"] = int(os.environ.get("STREAM_QUEUE_SIZE", 16))
+    # Each open stream holds a worker thread for as long as the page is open
+    config["STREAM_MAX_CLIENTS"] = int(os.environ.get("STREAM_MAX_CLIENTS", 32))
+    # Seconds a request waits for an on-demand forecast before answering 202
+    config["FORECAST_WAIT"] = float(os.environ.get("FORECAST_WAIT", 10))
+    config["LEADERBOARD_TTL"] = int(os.environ.get("LEADERBOARD_TTL", 60))
+    config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", 30))
+    config["USER_CACHE_SIZE"] = int(os.environ.get("USER_CACHE_SIZE", 4096))
+    config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+    config["PASSWORD_HASH_QUEUE"] = int(os.environ.get("PASSWORD_HASH_QUEUE", 32))
+    # Indicator series kept in memory (per symbol and interval) and points per series
+    config["INDICATOR_SERIES"] = int(os.environ.get("INDICATOR_SERIES", 128))
+    config["INDICATOR_POINTS"] = int(os.environ.get("INDICATOR_POINTS", 10000))
+    # Most recent bars returned by /chart and /api/indicators
+    config["CHART_MAX_POINTS"] = int(os.environ.get("CHART_MAX_POINTS", 1000))
+    # Monte Carlo portfolio risk: simulated paths, horizon in trading days and
+    # processes the paths are spread over (1 runs them in the request's worker)
+    config["RISK_PATHS"] = int(os.environ.get("RISK_PATHS", 100000))
+    config["RISK_HORIZON"] = int(os.environ.get("RISK_HORIZON", 10))
+    config["RISK_WORKERS"] = int(os.environ.get("RISK_WORKERS", 1))
+    config["PAGE_CACHE_SIZE"] = int(os.environ.get("PAGE_CACHE_SIZE", 64))
+    # Bytes; smaller responses aren't worth compressing
+    config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    config["COMPRESS_LEVEL"] = int(os.environ.get("COMPRESS_LEVEL", 6))
+    # Cache-Control max-age (seconds) for files under static/
+    config["SEND_FILE_MAX_AGE_DEFAULT"] = int(os.environ.get("STATIC_MAX_AGE", 86400))
+    # Seconds; requests slower than this keep sampled stacks (0 turns profiling off)
+    config["PROFILE_SLOW_REQUESTS"] = float(os.environ.get("PROFILE_SLOW_REQUESTS", 0))
+    # Import heavy modules and prime the market data snapshot before serving
+    config["WARM_UP"] = os.environ.get("WARM_UP", "0") == "1"
+    return config
+
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+bcrypt = Bcrypt()
+
+# Routes and request hooks are collected here and registered on the app by
+# create_app(), keeping the endpoint names url_for() and the templates use
+_routes = []
+_hooks = []
+
+
+def route(rule, **options):
+    def decorator(fn):
+        _routes.append((rule, fn, options))
+        return fn
+
+    return decorator
+
+
+def hook(name):
+    def decorator(fn):
+        _hooks.append((name, fn))
+        return fn
+
+    return decorator
+
+
+# Prometheus-style metrics, served as text from /metrics
+metrics_registry = metrics.Registry()
+REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("route", "method", "status")
+)
+REQUEST_SQL_QUERIES = metrics_registry.histogram(
+    "http_request_sql_queries", "SQL statements per request.", ("route",), buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250)
+)
+REQUEST_SQL_SECONDS = metrics_registry.histogram(
+    "http_request_sql_seconds", "Time spent in SQL per request.", ("route",)
+)
+SQL_QUERIES = metrics_registry.counter("sql_queries_total", "SQL statements executed.", ("operation",))
+SQL_SECONDS = metrics_registry.histogram("sql_query_duration_seconds", "SQL statement latency.", ("operation",))
+EXTERNAL_SECONDS = metrics_registry.histogram(
+    "external_call_duration_seconds", "Market data, news and scraping calls.", ("source", "call")
+)
+CHART_SECONDS = metrics_registry.histogram("chart_render_seconds", "Chart figure JSON build time.", ("window",))
+for _field in ("hits", "misses", "stale_hits", "hit_ratio"):
+    metrics_registry.gauge(
+        f"cache_{_field}",
+        f"Cache {_field.replace('_', ' ')}.",
+        lambda field=_field: {(name,): cache.stats()[field] for name, cache in services()["caches"].items()},
+        ("cache",),
+    )
+
+
+def services():
+    # Caches and background services of the current app, built by init_services()
+    return current_app.extensions["services"]
+
+
+def _service(name):
+    return LocalProxy(lambda: current_app.extensions["services"][name])
+
+
+quote_cache = _service("quote_cache")
+intraday_cache = _service("intraday_cache")
+forecast_cache = _service("forecast_cache")
+leaderboard_cache = _service("leaderboard_cache")
+risk_cache = _service("risk_cache")
+user_cache = _service("user_cache")
+password_hasher = _service("password_hasher")
+page_cache = _service("page_cache")
+response_optimizer = _service("response_optimizer")
+indicator_engine = _service("indicator_engine")
+market_provider = _service("market_provider")
+market_data_service = _service("market_data_service")
+news_feed = _service("news_feed")
+market_trends = _service("market_trends")
+price_stream = _service("price_stream")
+matching = _service("matching")
+
+
+def in_app_context(fn, app=None):
+    """``fn`` wrapped to run in ``app``'s context (default: the current app).
+
+    For work handed to cache and stream threads, which have no app context
+    of their own.
+    """
+    app = app or current_app._get_current_object()
+
+    def run(*args):
+        with app.app_context():
+            return fn(*args)
+
+    return run
 
 
 class User(db.Model, UserMixin):
@@ -35,6 +197,11 @@ class User(db.Model, UserMixin):
     password = db.Column(db.String(150), nullable=False)
     funds = db.Column(db.Float, nullable=False, default=10000)
 
+    __table_args__ = (
+        # Keyset pagination of the admin user list by funds
+        db.Index("ix_user_funds_id", "funds", "id"),
+    )
+
 
 class StockTransaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -44,10 +211,108 @@ class StockTransaction(db.Model):
     transaction_type = db.Column(db.String(4), nullable=False)  # 'BUY' or 'SELL'
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_stock_transaction_user_symbol", "user_id", "stock_symbol"),
+    )
+
+
+class Holding(db.Model):
+    # Materialized position per (user, symbol), kept in step with the
+    # StockTransaction ledger by orders.apply_order() in the same DB transaction.
+    # cost_basis is the FIFO cost of the open lots, as on the portfolio page.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    stock_symbol = db.Column(db.String(10), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    cost_basis = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_holding_user_symbol", "user_id", "stock_symbol", unique=True),
+    )
+
+
+def get_holding(user_id, stock_symbol):
+    return Holding.query.filter_by(user_id=user_id, stock_symbol=stock_symbol).first()
+
+
+def get_holding_quantity(user_id, stock_symbol):
+    holding = get_holding(user_id, stock_symbol)
+    return holding.quantity if holding else 0
+
+
+def replay_holdings(user_id=None):
+    # Rebuild positions from the ledger: {(user_id, symbol): [quantity, cost_basis]}
+    positions = valuation.fifo_positions(valuation.load_transactions(db.engine, user_id))
+    return {
+        (int(user_id), symbol): [int(quantity), float(cost)]
+        for (user_id, symbol), quantity, cost in zip(positions.index, positions["quantity"], positions["cost"])
+    }
+
+
+@click.command("rebuild-holdings")
+@click.option("--verify", is_flag=True, help="Only compare the holdings table with the ledger.")
+@with_appcontext
+def rebuild_holdings_command(verify):
+    """Rebuild (or verify) the holdings table by replaying StockTransaction."""
+    db.create_all()
+    for model in (User, StockTransaction):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    positions = replay_holdings()
+
+    if verify:
+        stored = {
+            (h.user_id, h.stock_symbol): h for h in Holding.query.all()
+        }
+        mismatches = 0
+        for key in set(positions) | set(stored):
+            expected = positions.get(key, [0, 0.0])
+            holding = stored.get(key)
+            actual = [holding.quantity, holding.cost_basis] if holding else [0, 0.0]
+            if expected[0] != actual[0] or abs(expected[1] - actual[1]) > 1e-6:
+                mismatches += 1
+                click.echo(f"user {key[0]} {key[1]}: ledger={expected} holdings={actual}")
+        click.echo(f"{len(positions)} positions checked, {mismatches} mismatches.")
+        if mismatches:
+            raise SystemExit(1)
+        return
+
+    Holding.query.delete()
+    db.session.bulk_insert_mappings(
+        Holding,
+        [
+            {"user_id": user_id, "stock_symbol": symbol, "quantity": quantity, "cost_basis": cost_basis}
+            for (user_id, symbol), (quantity, cost_basis) in positions.items()
+        ],
+    )
+    db.session.commit()
+    click.echo(f"Rebuilt {len(positions)} holdings.")
+
+
+def fetch_user_row(engine, user_id):
+    with engine.connect() as conn:
+        row = conn.execute(select(User.__table__).where(User.id == user_id)).mappings().first()
+    return dict(row) if row is not None else None
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # The user row is cached per process (invalidated when funds change or the
+    # user is deleted) and attached to the session without a SELECT, so
+    # User.query.get() later in the request is an identity map hit
+    user_id = int(user_id)
+    engine = db.engine
+    try:
+        row, _ = user_cache.get(user_id, lambda: fetch_user_row(engine, user_id))
+    except TimeoutError:
+        # The cache's fetch pool is backed up; don't fail the request over it
+        row = fetch_user_row(engine, user_id)
+    if row is None:
+        return None
+    user = User(**row)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
 
 
 # @app.before_first_request
@@ -66,11 +331,18 @@ def validate_password(password):
     return True
 
 
-@app.route("/")
+def render_page(name, version, template, **context):
+    # For pages whose HTML depends only on the login state (the navbar) and
+    # on ``version`` of the data they show
+    key = (name, current_user.is_authenticated)
+    return page_cache.get(key, version, lambda: render_template(template, **context))
+
+
+@route("/")
 def landing_route():
-    return render_template("index.html")
+    return render_page("landing", None, "index.html")
 
-@app.route("/signup", methods=["GET", "POST"])
+@route("/signup", methods=["GET", "POST"])
 def signup():
     if request.method == "POST":
         username = request.form["username"]
@@ -93,7 +365,11 @@ def signup():
             return redirect(url_for("signup"))
 
         # If validations pass, hash the password and create the user
-        hashed_password = bcrypt.generate_password_hash(password).decode("utf-8")
+        try:
+            hashed_password = password_hasher.generate(password)
+        except HasherBusy:
+            flash("The server is busy, please try again in a moment.", "danger")
+            return render_template("signup.html"), 503
         user = User(username=username, password=hashed_password)
         db.session.add(user)
         db.session.commit()
@@ -105,13 +381,18 @@ def signup():
 
 
 
-@app.route("/login", methods=["GET", "POST"])
+@route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
         user = User.query.filter_by(username=username).first()
-        if user and bcrypt.check_password_hash(user.password, password):
+        try:
+            valid = user is not None and password_hasher.check(user.password, password)
+        except HasherBusy:
+            flash("The server is busy, please try again in a moment.", "danger")
+            return render_template("login.html"), 503
+        if valid:
             login_user(user)
             return redirect(url_for("trade"))
         else:
@@ -119,7 +400,7 @@ def login():
     return render_template("login.html")
 
 
-@app.route("/logout")
+@route("/logout")
 @login_required
 def logout():
     logout_user()
@@ -128,285 +409,673 @@ def logout():
 
 
 # Home route
-@app.route("/home")
+@route("/home")
 def home():
-    return render_template("home.html")
+    return render_page("home", None, "home.html")
 
 
 # News route
-@app.route("/news")
+@route("/news")
 def news():
-    news_data = fetch_latest_news()
-    return render_template("news.html", news_data=news_data)
-
-
-# Predefined list of stock symbols for the dropdown
-STOCK_SYMBOLS = [
-    "AAPL",
-    "MSFT",
-    "GOOGL",
-    "AMZN",
-    "FB",
-    "TSLA",
-    "BRK-A",
-    "JNJ",
-    "V",
-    "WMT",
-    "JPM",
-    "MA",
-    "PG",
-    "UNH",
-    "NVDA",
-    "HD",
-    "DIS",
-    "PYPL",
-    "VZ",
-    "ADBE",
-]
-
-
-@app.route("/trade")
-def trade():
-    return render_template("trade.html", symbols=STOCK_SYMBOLS)
+    return render_page("news", news_feed.version, "news.html", news_data=news_feed.items())
 
 
-@app.route("/get_stock_price", methods=["POST"])
+@route("/trade")
+def trade():
+    return render_page("trade", None, "trade.html", symbols=STOCK_SYMBOLS)
+
+
+# Chart windows: title label, fallback window used when the primary one has
+# no bars (e.g. outside market hours), lookback and bar interval. "history" is
+# how far back indicator overlays are seeded, so they're warmed up on screen.
+CHART_WINDOWS = {
+    "6h": {
+        "title": "Last 6 Hours",
+        "fallback": "5d",
+        "lookback": datetime.timedelta(hours=6),
+        "interval": "5m",
+        "history": datetime.timedelta(days=5),
+    },
+    "5d": {
+        "title": "Last 5 Days",
+        "fallback": None,
+        "lookback": datetime.timedelta(days=5),
+        "interval": "1h",
+        "history": datetime.timedelta(days=30),
+    },
+}
+
+
+# Order book fills settle into StockTransaction/Holding through the same
+# conditional updates as market orders
+def settle_book_fills(fills):
+    orders.settle_fills(db.engine, fills)
+    for user_id in {fill.buyer_id for fill in fills} | {fill.seller_id for fill in fills}:
+        user_cache.invalidate(user_id)
+
+
+@EXTERNAL_SECONDS.time(source="yahoo_fin", call="get_day_gainers")
+def day_gainers():
+    # yahoo_fin drags in requests_html and friends; only the trends refresh needs it
+    from yahoo_fin import stock_info as si
+
+    return si.get_day_gainers()
+
+
+@EXTERNAL_SECONDS.time(source="yahoo_fin", call="get_day_losers")
+def day_losers():
+    from yahoo_fin import stock_info as si
+
+    return si.get_day_losers()
+
+
+@hook("before_request")
+def start_background_refresh():
+    market_data_service.start()
+    news_feed.start()
+    market_trends.start()
+    if services()["slow_request_profiler"] is not None:
+        services()["slow_request_profiler"].start()
+
+
+@hook("before_request")
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.begin_request_sql()
+    if services()["slow_request_profiler"] is not None:
+        services()["slow_request_profiler"].begin()
+
+
+@hook("after_request")
+def record_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+
+# Registered after record_response_status so it runs first (after_request
+# hooks run in reverse) and 304s are recorded as such
+@hook("after_request")
+def optimize_response(response):
+    return response_optimizer.process(request, response, buffer_files=request.endpoint == "static")
+
+
+@hook("teardown_request")
+def record_request_metrics(exc):
+    started = g.pop("request_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    status = g.pop("response_status", 500)
+    REQUEST_SECONDS.observe(duration, route=route, method=request.method, status=status)
+    queries, sql_seconds = metrics.end_request_sql()
+    REQUEST_SQL_QUERIES.observe(queries, route=route)
+    REQUEST_SQL_SECONDS.observe(sql_seconds, route=route)
+    profiler = services()["slow_request_profiler"]
+    if profiler is not None:
+        profiler.end(duration, route=route, method=request.method, path=request.path, status=status)
+
+
+def fetch_quote(stock_symbol):
+    quotes = market_provider.fetch_quotes([stock_symbol])
+    if stock_symbol not in quotes:
+        raise LookupError(f"No quote available for {stock_symbol}")
+    return quotes[stock_symbol]
+
+
+def fetch_bars(stock_symbol, window, lookback=None):
+    spec = CHART_WINDOWS[window]
+    now = market_data.utcnow()
+    bars = market_provider.fetch_ohlcv([stock_symbol], now - (lookback or spec["lookback"]), now, spec["interval"])
+    return bars.get(stock_symbol, pd.DataFrame(columns=market_data.OHLCV_COLUMNS))
+
+
+def get_quote(stock_symbol):
+    # Universe symbols are served from the background snapshot; anything else
+    # (or a cold snapshot) goes through the single-flight cache.
+    snapshot = market_data_service.get_quote(stock_symbol)
+    if snapshot is not None:
+        return snapshot
+    return quote_cache.get(("quote", stock_symbol), in_app_context(lambda: fetch_quote(stock_symbol)))
+
+
+def get_bars(stock_symbol, window):
+    # Returns (bars, window, stale), walking the fallback chain for empty windows
+    while window is not None:
+        snapshot = market_data_service.get_bars(stock_symbol, window)
+        if snapshot is not None:
+            bars, stale = snapshot
+        else:
+            bars, stale = intraday_cache.get(
+                ("bars", stock_symbol, window), in_app_context(lambda: fetch_bars(stock_symbol, window))
+            )
+        if not bars.empty:
+            return bars, window, stale
+        window = CHART_WINDOWS[window]["fallback"]
+    return None, None, False
+
+
+def get_indicators(stock_symbol, window):
+    """Returns (series, window, stale, first chart bar in ns) for a chart window.
+
+    A series is computed once over the window's longer "history" so the
+    overlays are warmed up from the first chart bar; after that only the
+    chart bars newer than its last one are applied.
+    """
+    bars, window, stale = get_bars(stock_symbol, window)
+    if bars is None:
+        return None, None, stale, None
+    spec = CHART_WINDOWS[window]
+    key = (stock_symbol, spec["interval"])
+    chart_arrays = indicators.frame_arrays(bars)
+    arrays = chart_arrays
+    if indicator_engine.last_timestamp(key) is None:
+        history, _ = intraday_cache.get(
+            ("history", stock_symbol, window),
+            in_app_context(lambda: fetch_bars(stock_symbol, window, spec["history"])),
+        )
+        if not history.empty:
+            arrays = indicators.frame_arrays(history)
+    session_ns = None if spec["interval"] == "1d" else indicators.DAY_NS
+    series = indicator_engine.update(key, *arrays, session_ns=session_ns)
+    if arrays is not chart_arrays:
+        # The chart bars may be newer than the history
+        series = indicator_engine.update(key, *chart_arrays, session_ns=session_ns)
+    return series, window, stale, int(chart_arrays[0][0])
+
+
+def poll_price(stock_symbol, last):
+    # Builds the next stream event: the latest quote plus any chart bars newer
+    # than the ones already sent; None when nothing changed
+    price, stale = get_quote(stock_symbol)
+    bars, window, _ = get_bars(stock_symbol, "6h")
+    points = []
+    bar_time = last["bar_time"] if last else None
+    if bars is not None:
+        new = bars if bar_time is None else bars[bars.index > pd.Timestamp(bar_time)]
+        if last is None:
+            new = new.iloc[0:0]  # the page loads the full chart itself
+        points = [{"x": ts.isoformat(), "y": float(close)} for ts, close in new["Close"].items()]
+        bar_time = bars.index[-1].isoformat()
+    if last is not None and not points and last["price"] == price and last["stale"] == stale:
+        return None
+    return {
+        "symbol": stock_symbol,
+        "price": price,
+        "stale": stale,
+        "time": time.time(),
+        "window": window,
+        "bar_time": bar_time,
+        "points": points,
+    }
+
+
+@route("/get_stock_price", methods=["POST"])
 @login_required
 def get_stock_price():
     stock_symbol = request.form["symbol"]
-    stock = yf.Ticker(stock_symbol)
-    stock_info = stock.info
-    stock_price = stock_info.get("regularMarketPrice")
-    if stock_price is None:
-        stock_price = stock.history(period="1d")["Close"].iloc[-1]
-
-    # Fetch intraday data for the stock
-    now = datetime.datetime.now()
-    start = now - datetime.timedelta(hours=6)
-    intraday_data = stock.history(start=start, end=now, interval="5m")
-
-    graph_html = ""
-    if not intraday_data.empty:
-        # Determine color based on price movement
-        try:
-            price_change = intraday_data["Close"].iloc[-1] - intraday_data["Open"].iloc[0]
-            line_color = "green" if price_change > 0 else "red"
-
-            # Create plotly graph
-            # Create plotly graph
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=intraday_data.index, y=intraday_data["Close"], mode='lines', line=dict(color=line_color)))
-            fig.update_layout(
-                title=f"{stock_symbol} Performance (Last 6 Hours)",
-                xaxis_title="Time",
-                yaxis_title="Price",
-                template="plotly_dark",
-                paper_bgcolor="rgba(0, 0, 0, 0)",
-                plot_bgcolor="#111",
-                font=dict(color="#fff"),
-                xaxis=dict(
-                    gridcolor="#444",
-                    linecolor="#444"
-                ),
-                yaxis=dict(
-                    gridcolor="#444",
-                    linecolor="#444"
-                )
-            )
-
-            graph_html = pio.to_html(fig, full_html=False)
-        except IndexError:
-            flash("Error fetching intraday data for the stock. Displaying fallback data.")
-    else:
-        # Fetch historical data as a fallback
-        fallback_data = stock.history(period="5d", interval="1h")
-        if not fallback_data.empty:
-            try:
-                price_change = fallback_data["Close"].iloc[-1] - fallback_data["Open"].iloc[0]
-                line_color = "green" if price_change > 0 else "red"
-
-                # Create plotly graph with fallback data
-                # Create plotly graph with fallback data
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(x=fallback_data.index, y=fallback_data["Close"], mode='lines', line=dict(color=line_color)))
-                fig.update_layout(
-                    title=f"{stock_symbol} Performance (Last 5 Days)",
-                    xaxis_title="Time",
-                    yaxis_title="Price",
-                    template="plotly_dark",
-                    paper_bgcolor="rgba(0, 0, 0, 0)",
-                    plot_bgcolor="#111",
-                    font=dict(color="#fff"),
-                    xaxis=dict(
-                        gridcolor="#444",
-                        linecolor="#444"
-                    ),
-                    yaxis=dict(
-                        gridcolor="#444",
-                        linecolor="#444"
-                    )
-                )
-                graph_html = pio.to_html(fig, full_html=False)
-            except IndexError:
-                flash("Error fetching fallback data for the stock. Please try again later.")
-        else:
-            flash("No historical data available for the selected stock.")
+    stock_price, stale = get_quote(stock_symbol)
 
-    transactions = StockTransaction.query.filter_by(
-        stock_symbol=stock_symbol, user_id=current_user.id
-    ).all()
-    total_quantity = sum(
-        t.quantity for t in transactions if t.transaction_type == "BUY"
-    ) - sum(t.quantity for t in transactions if t.transaction_type == "SELL")
+    total_quantity = get_holding_quantity(current_user.id, stock_symbol)
 
     return render_template(
         "result.html",
         symbol=stock_symbol,
         price=stock_price,
+        stale=stale,
         funds=current_user.funds,
         quantity=total_quantity,
-        graph_html=graph_html
+        plotly_js_url=url_for("plotly_bundle", version=charts.PLOTLY_JS_VERSION),
     )
 
 
+@route("/chart/<symbol>")
+@login_required
+def chart(symbol):
+    window = request.args.get("window", "6h")
+    if window not in CHART_WINDOWS:
+        return jsonify(error=f"Unknown window '{window}'."), 400
+
+    try:
+        bars, window, stale = get_bars(symbol, window)
+    except Exception:
+        return jsonify(error="Error fetching chart data for the stock. Please try again later."), 503
+    if bars is None:
+        return jsonify(error="No historical data available for the selected stock."), 404
+
+    bars = bars.iloc[-current_app.config["CHART_MAX_POINTS"] :]
+    title = CHART_WINDOWS[window]["title"]
+    with CHART_SECONDS.timer(window=window):
+        payload = charts.figure_json(symbol, window, bars, title)
+    response = current_app.response_class(
+        '{"window": "%s", "stale": %s, "figure": %s}' % (window, "true" if stale else "false", payload),
+        mimetype="application/json",
+    )
+    return response
 
 
-@app.route("/buy_stock", methods=["POST"])
+@route("/api/indicators/<symbol>")
+@login_required
+def indicators_api(symbol):
+    window = request.args.get("window", "6h")
+    if window not in CHART_WINDOWS:
+        return jsonify(error=f"Unknown window '{window}'."), 400
+
+    try:
+        series, window, stale, start = get_indicators(symbol, window)
+    except Exception:
+        return jsonify(error="Error fetching chart data for the stock. Please try again later."), 503
+    if series is None:
+        return jsonify(error="No historical data available for the selected stock."), 404
+
+    with series.lock:
+        values = series.since(start)
+    limit = current_app.config["CHART_MAX_POINTS"]
+    values = {name: column[-limit:] for name, column in values.items()}
+    return jsonify(
+        symbol=symbol,
+        window=window,
+        interval=CHART_WINDOWS[window]["interval"],
+        stale=stale,
+        params=indicator_engine.params,
+        **values,
+    )
+
+
+@route("/stream/<symbol>")
+@login_required
+def stream_prices(symbol):
+    """Server-sent events with price ticks and new chart points for ``symbol``."""
+    # The generator runs after the request's app context is gone
+    stream = price_stream._get_current_object()
+    try:
+        subscription = stream.subscribe(symbol)
+    except StreamFull:
+        response = jsonify(error="Too many open price streams. Please try again later.")
+        response.headers["Retry-After"] = "30"
+        return response, 503
+
+    def events():
+        try:
+            while True:
+                event = subscription.get(timeout=15)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            stream.unsubscribe(subscription)
+
+    return current_app.response_class(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@route("/assets/plotly-<version>.min.js")
+def plotly_bundle(version):
+    if version != charts.PLOTLY_JS_VERSION:
+        return redirect(url_for("plotly_bundle", version=charts.PLOTLY_JS_VERSION))
+    response = current_app.response_class(charts.plotly_js(), mimetype="application/javascript")
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+@route("/metrics")
+def prometheus_metrics():
+    return current_app.response_class(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@route("/metrics/slow")
+def slow_requests():
+    # Stacks and cache internals are for operators only
+    if not session.get("admin_logged_in"):
+        return jsonify(error="Admin login required."), 403
+    profiler = services()["slow_request_profiler"]
+    if profiler is None:
+        return jsonify(error="Set PROFILE_SLOW_REQUESTS to enable the slow request profiler."), 404
+    return jsonify(profiler.slowest())
+
+
+@route("/cache/stats")
+def cache_stats():
+    if not session.get("admin_logged_in"):
+        return jsonify(error="Admin login required."), 403
+    return jsonify(
+        quote=quote_cache.stats(),
+        intraday=intraday_cache.stats(),
+        user=user_cache.stats(),
+        risk=risk_cache.stats(),
+        password_hasher=password_hasher.stats(),
+        pages=page_cache.stats(),
+        responses=response_optimizer.stats(),
+        indicators=indicator_engine.stats(),
+        market_data=market_data_service.status(),
+        news=news_feed.status(),
+        market_trends=market_trends.status(),
+        stream=price_stream.status(),
+    )
+
+
+
+
+@route("/buy_stock", methods=["POST"])
 @login_required
 def buy_stock():
     stock_symbol = request.form["symbol"]
     price = float(request.form["price"])
     quantity = int(request.form["quantity"])
 
-    total_cost = price * quantity
-
-    if current_user.funds >= total_cost:
-        current_user.funds -= total_cost
-        transaction = StockTransaction(
-            stock_symbol=stock_symbol,
-            quantity=quantity,
-            price=price,
-            transaction_type="BUY",
-            user_id=current_user.id,
-        )
-        db.session.add(transaction)
-        db.session.commit()
-        flash("Stock bought successfully!", "success")
-    else:
-        flash("Insufficient funds.", "danger")
+    result = orders.execute_order(db.engine, current_user.id, stock_symbol, "BUY", quantity, price)
+    user_cache.invalidate(current_user.id)
+    flash(result.message, "success" if result.ok else "danger")
 
     return redirect(url_for("get_stock_price"), code=307)
 
 
-@app.route("/sell_stock", methods=["POST"])
+@route("/sell_stock", methods=["POST"])
 @login_required
 def sell_stock():
     stock_symbol = request.form["symbol"]
     price = float(request.form["price"])
     quantity = int(request.form["quantity"])
 
-    transactions = StockTransaction.query.filter_by(
-        stock_symbol=stock_symbol, user_id=current_user.id
-    ).all()
-    total_quantity = sum(
-        t.quantity for t in transactions if t.transaction_type == "BUY"
-    ) - sum(t.quantity for t in transactions if t.transaction_type == "SELL")
-
-    if total_quantity >= quantity:
-        current_user.funds += price * quantity
-        transaction = StockTransaction(
-            stock_symbol=stock_symbol,
-            quantity=quantity,
-            price=price,
-            transaction_type="SELL",
-            user_id=current_user.id,
-        )
-        db.session.add(transaction)
-        db.session.commit()
-        flash("Stock sold successfully!", "success")
-    else:
-        flash("Insufficient stock quantity.", "danger")
+    result = orders.execute_order(db.engine, current_user.id, stock_symbol, "SELL", quantity, price)
+    user_cache.invalidate(current_user.id)
+    flash(result.message, "success" if result.ok else "danger")
 
     return redirect(url_for("get_stock_price"), code=307)
 
 
-def fetch_latest_news():
-    url = "https://finance.yahoo.com/rss/topstories"  # Example URL; replace with actual Yahoo Finance API endpoint
-    response = requests.get(url)
-    if response.status_code == 200:
-        try:
-            # Parse the RSS feed
-            news_data = xmltodict.parse(response.content)
-            return news_data["rss"]["channel"]["item"]  # Extract relevant news items
-        except Exception as e:
-            return [{"title": "Error", "description": str(e), "link": ""}]
-    else:
-        return [{"title": "Error", "description": "Failed to fetch news", "link": ""}]
+@route("/api/trade/<side>", methods=["POST"])
+@login_required
+def trade_api(side):
+    """Execute one buy/sell and return only what changed, for in-page updates."""
+    side = side.upper()
+    if side not in ("BUY", "SELL"):
+        return jsonify(error="Side must be buy or sell."), 404
+    payload = request.get_json(silent=True) or request.form
+    try:
+        symbol = str(payload["symbol"])
+        quantity = int(payload["quantity"])
+        price = float(payload["price"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error="Expected symbol, quantity and price."), 400
+
+    result = orders.execute_order(db.engine, current_user.id, symbol, side, quantity, price)
+    user_cache.invalidate(current_user.id)
+    return jsonify(
+        ok=result.ok,
+        message=result.message,
+        side=side,
+        symbol=symbol,
+        funds=result.funds,
+        quantity=result.quantity,
+        price=result.price,
+    ), (200 if result.ok else 409)
+
+
+@route("/api/orders/bulk", methods=["POST"])
+@login_required
+def bulk_orders():
+    payload = request.get_json(silent=True) or {}
+    batch = payload.get("orders")
+    if not isinstance(batch, list) or not batch:
+        return jsonify(error="Expected a JSON body with a non-empty 'orders' list."), 400
+    if len(batch) > current_app.config["BULK_ORDER_LIMIT"]:
+        return jsonify(error=f"At most {current_app.config['BULK_ORDER_LIMIT']} orders per request."), 413
+
+    try:
+        results, funds, positions = orders.execute_batch(db.engine, current_user.id, batch)
+    except orders.OrderRejected as e:
+        return jsonify(error=str(e)), 400
+    finally:
+        user_cache.invalidate(current_user.id)
+
+    filled = sum(1 for result in results if result["ok"])
+    return jsonify(
+        results=results,
+        filled=filled,
+        rejected=len(results) - filled,
+        funds=funds,
+        positions=positions,
+    )
 
 
-@app.route("/about")
-def about():
-    return render_template("about.html")
+@route("/api/book/<symbol>")
+def order_book(symbol):
+    levels = min(max(request.args.get("levels", 10, type=int), 1), 100)
+    return jsonify(matching.depth(symbol, levels))
 
 
-@app.route("/portfolio")
+@route("/api/book/<symbol>/orders", methods=["POST"])
 @login_required
-def portfolio():
-    transactions = StockTransaction.query.filter_by(user_id=current_user.id).all()
-    portfolio = {}
+def submit_book_order(symbol):
+    # Books are created on first order, so only for the app's universe
+    if symbol not in STOCK_SYMBOLS:
+        return jsonify(error=f"Unknown symbol {symbol}."), 404
+    payload = request.get_json(silent=True) or {}
+    try:
+        quantity = int(payload.get("quantity", 0))
+        price = payload.get("price")
+        price = float(price) if price is not None else None
+        order, fills = matching.submit(
+            current_user.id,
+            symbol,
+            str(payload.get("side", "")),
+            quantity,
+            price,
+            kind=str(payload.get("type", matching_engine.LIMIT)),
+            tif=str(payload.get("tif", matching_engine.GTC)),
+        )
+    except (TypeError, ValueError):
+        return jsonify(error="Quantity and price must be numbers."), 400
+    except (matching_engine.OrderRejected, orders.OrderRejected) as e:
+        return jsonify(error=str(e)), 409
+    return jsonify(order=order.to_dict(), fills=[fill._asdict() for fill in fills])
 
-    for transaction in transactions:
-        if transaction.stock_symbol not in portfolio:
-            portfolio[transaction.stock_symbol] = {"quantity": 0, "total_value": 0}
 
-        if transaction.transaction_type == "BUY":
-            portfolio[transaction.stock_symbol]["quantity"] += transaction.quantity
-            portfolio[transaction.stock_symbol]["total_value"] += (
-                transaction.price * transaction.quantity
-            )
-        elif transaction.transaction_type == "SELL":
-            portfolio[transaction.stock_symbol]["quantity"] -= transaction.quantity
-            portfolio[transaction.stock_symbol]["total_value"] -= (
-                transaction.price * transaction.quantity
-            )
+@route("/api/book/<symbol>/orders/<int:order_id>", methods=["DELETE"])
+@login_required
+def cancel_book_order(symbol, order_id):
+    order = matching.cancel(order_id, user_id=current_user.id)
+    if order is None:
+        return jsonify(error="No open order with that id."), 404
+    return jsonify(order=order.to_dict())
+
+
+@route("/about")
+def about():
+    return render_template("about.html")
 
-    total_portfolio_value = sum(stock["total_value"] for stock in portfolio.values())
+
+def fetch_quotes(symbols):
+    # One upstream call for several symbols. Each quote is cached for
+    # get_quote, and symbols without one are remembered for a TTL so every
+    # page view doesn't ask for them again.
+    quotes = market_provider.fetch_quotes(symbols)
+    for symbol in symbols:
+        if symbol in quotes:
+            quote_cache.put(("quote", symbol), quotes[symbol])
+        else:
+            quote_cache.put(("unquoted", symbol), True)
+    return quotes
+
+
+def latest_prices(symbols):
+    # Snapshot and cached quotes first, then a single batched fetch for the rest
+    prices, missing = {}, []
+    for symbol in symbols:
+        snapshot = market_data_service.get_quote(symbol)
+        if snapshot is not None:
+            prices[symbol] = snapshot[0]
+            continue
+        price = quote_cache.peek(("quote", symbol))
+        if price is not None:
+            prices[symbol] = price
+        elif not quote_cache.peek(("unquoted", symbol), False):
+            missing.append(symbol)
+    if missing:
+        missing = sorted(missing)
+        try:
+            quotes, _ = quote_cache.get(("quotes", *missing), in_app_context(lambda: fetch_quotes(missing)))
+            prices.update(quotes)
+        except Exception:
+            # Valued at cost until a quote is available; a slow fetch still
+            # fills the cache when it finishes
+            for symbol in missing:
+                quote_cache.put(("unquoted", symbol), True)
+    return prices
+
+
+def value_positions(user_id=None):
+    # FIFO positions for one user (or everyone) marked at the latest quotes
+    positions = valuation.fifo_positions(valuation.load_transactions(db.engine, user_id))
+    open_symbols = positions.index.get_level_values("symbol")[positions["quantity"].to_numpy() != 0].unique()
+    return valuation.mark_to_market(positions, latest_prices(open_symbols))
+
+
+def render_portfolio(owner, **context):
+    valued = value_positions(owner.id)
+    totals = valuation.summarize(valued, {owner.id: owner.funds}).loc[owner.id]
     return render_template(
         "portfolio.html",
-        portfolio=portfolio,
-        total_portfolio_value=total_portfolio_value,
+        portfolio=valuation.open_positions(valued, owner.id),
+        total_portfolio_value=totals["market_value"],
+        totals=totals,
+        **context,
     )
 
 
-def get_market_data():
-    gainers = si.get_day_gainers()
-    losers = si.get_day_losers()
-
-    # Inspecting the first row of gainers and losers to understand the data structure
-    print("Gainers Data Example:", gainers.head(1).to_dict("records"))
-    print("Losers Data Example:", losers.head(1).to_dict("records"))
+@route("/portfolio")
+@login_required
+def portfolio():
+    return render_portfolio(current_user, risk_url=url_for("risk_api"))
+
+
+def portfolio_version(user_id):
+    # Every trade appends to the ledger, so its last id versions the holdings
+    return db.session.query(db.func.max(StockTransaction.id)).filter_by(user_id=user_id).scalar()
+
+
+def compute_risk(app, user_id):
+    # Runs on the cache's worker thread, so it needs its own app context
+    with app.app_context():
+        valued = value_positions(user_id)
+        positions = {
+            symbol: row["market_value"] for symbol, row in valuation.open_positions(valued, user_id).items()
+        }
+        closes = risk.load_closes(list(positions), market_provider, market_data_service.store)
+        return risk.portfolio_risk(
+            positions,
+            closes,
+            paths=app.config["RISK_PATHS"],
+            horizon=app.config["RISK_HORIZON"],
+            workers=app.config["RISK_WORKERS"],
+        )
 
-    top_gainers = gainers.head(5).to_dict("records")
-    top_losers = losers.head(5).to_dict("records")
 
-    return top_gainers, top_losers
+@route("/api/risk")
+@login_required
+def risk_api():
+    """VaR/CVaR and drawdown distribution of the current user's holdings."""
+    user_id = current_user.id
+    key = ("risk", user_id, portfolio_version(user_id), datetime.date.today().isoformat())
+    app = current_app._get_current_object()
+    try:
+        summary, _ = risk_cache.get(key, lambda: compute_risk(app, user_id))
+    except Exception:
+        return jsonify(error="Risk estimate is unavailable right now. Please try again later."), 503
+    return jsonify(summary)
+
+
+def compute_leaderboard(app):
+    # Runs on the cache's worker thread, so it needs its own app context
+    with app.app_context(), db.engine.connect() as conn:
+        prices = latest_prices(admin_queries.held_symbols(conn))
+        return admin_queries.leaderboard(conn, prices)
+
+
+@route("/api/leaderboard")
+def leaderboard():
+    limit = request.args.get("limit", 10, type=int)
+    app = current_app._get_current_object()
+    try:
+        ranking, _ = leaderboard_cache.get("leaderboard", lambda: compute_leaderboard(app))
+    except Exception:
+        # No ranking young enough to serve stale
+        response = jsonify(error="The leaderboard is unavailable right now. Please try again later.")
+        response.headers["Retry-After"] = "10"
+        return response, 503
+    return jsonify(ranking[: max(0, limit)])
+
+
+@route("/market/trends")
+def index():
+    snapshot = market_trends.snapshot()
+    # The page shows the age in whole minutes
+    minutes = None if snapshot["age"] is None else int(snapshot["age"] / 60 + 0.5)
+    return render_page(
+        "market_trends",
+        (snapshot["refreshed_at"], minutes),
+        "markettrends.html",
+        gainers=snapshot["gainers"],
+        losers=snapshot["losers"],
+        age=snapshot["age"],
+    )
 
 
-@app.route("/market/trends")
-def index():
-    gainers, losers = get_market_data()
-    return render_template("markettrends.html", gainers=gainers, losers=losers)
+@route("/market/trends.json")
+def market_trends_json():
+    return jsonify(market_trends.snapshot())
 
 
-@app.route("/predict", methods=["POST"])
+@route("/predict", methods=["POST"])
 @login_required
 def predict():
     stock_symbol = request.form["symbol"]
     return redirect(f"http://localhost:8501/?stock_symbol={stock_symbol}")
 
 
+def compute_forecast(symbol, provider_name):
+    # None when there's no history, so the miss is cached like a result
+    try:
+        return batch_forecast.compute_forecast(symbol, provider_name=provider_name)
+    except LookupError:
+        return None
+
+
+@route("/api/forecast/<symbol>")
+def forecast_api(symbol):
+    years = request.args.get("years", 1, type=int)
+    if not 1 <= years <= batch_forecast.MAX_YEARS:
+        return jsonify(error=f"years must be between 1 and {batch_forecast.MAX_YEARS}."), 400
+
+    data = batch_forecast.load_forecast(symbol)
+    if data is None:
+        # Not precomputed by the nightly job: compute once, single-flight, and
+        # only for the app's universe. The fetch runs on the cache's worker
+        # thread, outside the app context.
+        if symbol not in STOCK_SYMBOLS:
+            return jsonify(error=f"No forecast available for {symbol}."), 404
+        provider_name = current_app.config["MARKET_DATA_PROVIDER"]
+        try:
+            computed, _ = forecast_cache.get(("forecast", symbol), lambda: compute_forecast(symbol, provider_name))
+        except TimeoutError:
+            response = jsonify(status="pending", message=f"The forecast for {symbol} is being computed.")
+            response.headers["Retry-After"] = "10"
+            return response, 202
+        if computed is not None:
+            data = batch_forecast.load_forecast(symbol)
+        if data is None:
+            return jsonify(error=f"No forecast available for {symbol}."), 404
+
+    return jsonify(batch_forecast.forecast_payload(symbol, data, years))
+
+
 # Admin panel
-@app.route("/admin_login", methods=["GET", "POST"])
+@route("/admin_login", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         username = request.form["username"]
@@ -420,66 +1089,219 @@ def admin_login():
     return render_template("admin_login.html")
 
 
-@app.route("/admin_logout")
+@route("/admin_logout")
 def admin_logout():
     session.pop("admin_logged_in", None)
     flash("Admin has been logged out.", "info")
     return redirect(url_for("admin_login"))
 
 
-@app.route("/admin")
+@route("/admin")
 def admin():
     if not session.get("admin_logged_in"):
         return redirect(url_for("admin_login"))
 
-    users = User.query.all()
-    return render_template("admin.html", users=users)
+    sort = request.args.get("sort", "id")
+    if sort not in admin_queries.SORTS:
+        sort = "id"
+    after = request.args.get("after")
+    if after:
+        try:
+            after = admin_queries.parse_cursor(after)
+        except ValueError:
+            after = None  # a hand-edited link: start again from the first page
+    limit = request.args.get("limit", admin_queries.PAGE_SIZE, type=int)
+
+    with db.engine.connect() as conn:
+        prices = latest_prices(admin_queries.held_symbols(conn))
+        users, next_cursor = admin_queries.page_users(conn, prices, sort, after or None, limit)
+    return render_template(
+        "admin.html",
+        users=users,
+        sort=sort,
+        sorts=admin_queries.SORTS,
+        next_after=None if next_cursor is None else "%s:%s" % next_cursor,
+    )
 
 
-@app.route("/admin/delete_user/<int:user_id>")
+@route("/admin/delete_user/<int:user_id>")
 def delete_user(user_id):
     if not session.get("admin_logged_in"):
         return redirect(url_for("admin_login"))
 
-    user = User.query.get_or_404(user_id)
-    db.session.delete(user)
-    db.session.commit()
+    User.query.get_or_404(user_id)
+    # Resting orders would otherwise stay in the book with nothing behind them
+    matching.cancel_user(user_id)
+    orders.run_immediate(db.engine, lambda conn: admin_queries.delete_user(conn, user_id))
+    user_cache.invalidate(user_id)
+    leaderboard_cache.invalidate("leaderboard")
     flash("User deleted successfully!", "success")
     return redirect(url_for("admin"))
 
 
-@app.route("/admin/view_portfolio/<int:user_id>")
+@route("/admin/view_portfolio/<int:user_id>")
 def admin_view_portfolio(user_id):
     if not session.get("admin_logged_in"):
         return redirect(url_for("admin_login"))
 
     user = User.query.get_or_404(user_id)
-    transactions = StockTransaction.query.filter_by(user_id=user.id).all()
-    portfolio = {}
+    return render_portfolio(user, user=user)
 
-    for transaction in transactions:
-        if transaction.stock_symbol not in portfolio:
-            portfolio[transaction.stock_symbol] = {"quantity": 0, "total_value": 0}
 
-        if transaction.transaction_type == "BUY":
-            portfolio[transaction.stock_symbol]["quantity"] += transaction.quantity
-            portfolio[transaction.stock_symbol]["total_value"] += (
-                transaction.price * transaction.quantity
-            )
-        elif transaction.transaction_type == "SELL":
-            portfolio[transaction.stock_symbol]["quantity"] -= transaction.quantity
-            portfolio[transaction.stock_symbol]["total_value"] -= (
-                transaction.price * transaction.quantity
-            )
+def init_services(app):
+    """Build the caches and background services from ``app.config``.
 
-    total_portfolio_value = sum(stock["total_value"] for stock in portfolio.values())
-    return render_template(
-        "portfolio.html",
-        portfolio=portfolio,
-        total_portfolio_value=total_portfolio_value,
-        user=user,
+    They're kept in ``app.extensions["services"]``, so every app gets its
+    own; the module-level names (``quote_cache`` and so on) proxy to the
+    current app's.
+    """
+    config = app.config
+
+    # Shared caches so repeated lookups (including the 307 replay after a trade)
+    # don't hit the market data provider again for the same symbol.
+    quote_cache = QuoteCache(
+        ttl=config["QUOTE_CACHE_TTL"],
+        max_size=config["MARKET_CACHE_SIZE"],
+        fetch_timeout=config["MARKET_FETCH_TIMEOUT"],
+    )
+    intraday_cache = QuoteCache(
+        ttl=config["INTRADAY_CACHE_TTL"],
+        max_size=config["MARKET_CACHE_SIZE"],
+        fetch_timeout=config["MARKET_FETCH_TIMEOUT"],
+    )
+    # Requests stop waiting after FORECAST_WAIT; the fit keeps running and
+    # later requests join it. Symbols without history are cached as None.
+    forecast_cache = QuoteCache(ttl=60, max_size=64, max_stale=0, fetch_timeout=config["FORECAST_WAIT"], workers=2)
+    leaderboard_cache = QuoteCache(ttl=config["LEADERBOARD_TTL"], max_size=1, fetch_timeout=60, workers=1)
+    # Keyed by portfolio version and date, so entries never need invalidating
+    risk_cache = QuoteCache(ttl=86400, max_size=256, max_stale=0, fetch_timeout=60, workers=1)
+    # Logged-in user rows; never served stale, since funds gate orders
+    user_cache = QuoteCache(ttl=config["USER_CACHE_TTL"], max_size=config["USER_CACHE_SIZE"], max_stale=0)
+    page_cache = FragmentCache(max_size=config["PAGE_CACHE_SIZE"])
+    response_optimizer = ResponseOptimizer(min_size=config["COMPRESS_MIN_SIZE"], gzip_level=config["COMPRESS_LEVEL"])
+    caches = {
+        "quote": quote_cache,
+        "intraday": intraday_cache,
+        "forecast": forecast_cache,
+        "leaderboard": leaderboard_cache,
+        "risk": risk_cache,
+        "user": user_cache,
+        "page": page_cache,
+    }
+    password_hasher = PasswordHasher(
+        bcrypt, workers=config["PASSWORD_HASH_WORKERS"], max_pending=config["PASSWORD_HASH_QUEUE"]
+    )
+    indicator_engine = indicators.IndicatorEngine(
+        max_series=config["INDICATOR_SERIES"], max_points=config["INDICATOR_POINTS"]
+    )
+    slow_request_profiler = (
+        metrics.SlowRequestProfiler(threshold=config["PROFILE_SLOW_REQUESTS"])
+        if config["PROFILE_SLOW_REQUESTS"] > 0
+        else None
+    )
+
+    market_provider = market_data.get_provider(config["MARKET_DATA_PROVIDER"])
+    for call in ("fetch_ohlcv", "fetch_quotes"):
+        setattr(
+            market_provider,
+            call,
+            EXTERNAL_SECONDS.time(source=market_provider.name, call=call)(getattr(market_provider, call)),
+        )
+    market_data_service = market_data.MarketDataService(
+        market_provider,
+        STOCK_SYMBOLS,
+        {window: (spec["lookback"], spec["interval"]) for window, spec in CHART_WINDOWS.items()},
+        refresh_interval=config["MARKET_DATA_REFRESH"],
+        store=ohlcv_store.OHLCVStore(config["OHLCV_STORE_DIR"]) if config["OHLCV_STORE_DIR"] else None,
     )
 
+    news_feed = NewsFeed(
+        config["NEWS_FEED_URL"],
+        refresh_interval=config["NEWS_REFRESH"],
+        timeout=config["NEWS_TIMEOUT"],
+    )
+    news_feed.refresh = EXTERNAL_SECONDS.time(source="news", call="refresh")(news_feed.refresh)
+
+    market_trends = MarketTrends(day_gainers, day_losers, refresh_interval=config["MARKET_TRENDS_REFRESH"])
+
+    price_stream = PriceStream(
+        in_app_context(poll_price, app),
+        interval=config["STREAM_POLL_INTERVAL"],
+        queue_size=config["STREAM_QUEUE_SIZE"],
+        max_subscribers=config["STREAM_MAX_CLIENTS"],
+    )
+
+    # Limit order books, one per symbol
+    matching = matching_engine.MatchingEngine(
+        balances=lambda user_id, symbol: orders.get_position(db.engine, user_id, symbol),
+        settle=settle_book_fills,
+    )
+
+    app.extensions["services"] = {
+        "quote_cache": quote_cache,
+        "intraday_cache": intraday_cache,
+        "forecast_cache": forecast_cache,
+        "leaderboard_cache": leaderboard_cache,
+        "risk_cache": risk_cache,
+        "user_cache": user_cache,
+        "password_hasher": password_hasher,
+        "page_cache": page_cache,
+        "response_optimizer": response_optimizer,
+        "slow_request_profiler": slow_request_profiler,
+        "indicator_engine": indicator_engine,
+        "market_provider": market_provider,
+        "market_data_service": market_data_service,
+        "news_feed": news_feed,
+        "market_trends": market_trends,
+        "price_stream": price_stream,
+        "matching": matching,
+        "caches": caches,
+    }
+
+
+def warm_up(app):
+    """Pay the first-request costs at startup.
+
+    Meant for preforking servers (``gunicorn --preload``), where it runs once
+    in the master and workers inherit the loaded modules. Background refresh
+    threads still start on each worker's first request.
+    """
+    lazy_imports.load(pd, charts)
+    from yahoo_fin import stock_info  # noqa: F401
+
+    charts.plotly_js()
+    with app.app_context():
+        market_data_service.refresh()
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.update(load_config())
+    app.config.update(config or {})
+
+    db.init_app(app)
+    login_manager.init_app(app)
+    bcrypt.init_app(app)
+    with app.app_context():
+        orders.configure_sqlite(db.engine)
+        metrics.instrument_sqlalchemy(db.engine, SQL_QUERIES, SQL_SECONDS)
+
+    init_services(app)
+    for rule, view_func, options in _routes:
+        app.add_url_rule(rule, view_func=view_func, **options)
+    for name, fn in _hooks:
+        getattr(app, name)(fn)
+    app.cli.add_command(rebuild_holdings_command)
+
+    if app.config["WARM_UP"]:
+        warm_up(app)
+    return app
+
+
+app = create_app()
+
 
 if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
     app.run(debug=True)
@@ -0,0 +1,226 @@
+"""Vectorized backtests of rule-based strategies over daily OHLCV history.
+
+A strategy turns a close-price array into a signal matrix with one column
+per parameter set (1 = long, 0 = flat); ``backtest`` then evaluates every
+column at once. Sweeps fan symbols out over a process pool:
+
+    python backtest.py AAPL MSFT --strategy sma --fast 5:50:5 --slow 20:200:10
+"""
+import argparse
+import datetime
+import itertools
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from symbols import STOCK_SYMBOLS
+
+START = "2019-01-01"
+TRADING_DAYS = 252
+
+BacktestResult = namedtuple("BacktestResult", "params equity stats")
+
+
+def rolling_mean(close, windows):
+    """Simple moving averages of ``close``, one column per window (NaN until full)."""
+    close = np.asarray(close, dtype=np.float64)
+    csum = np.concatenate(([0.0], np.cumsum(close)))
+    out = np.full((len(close), len(windows)), np.nan)
+    for j, window in enumerate(windows):
+        if window <= len(close):
+            out[window - 1 :, j] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def sma_crossover(close, params):
+    """Long while the fast SMA is above the slow one."""
+    fast = np.array([p["fast"] for p in params])
+    slow = np.array([p["slow"] for p in params])
+    windows, index = np.unique(np.concatenate((fast, slow)), return_inverse=True)
+    means = rolling_mean(close, windows)
+    fast_mean = means[:, index[: len(params)]]
+    slow_mean = means[:, index[len(params) :]]
+    # NaN comparisons are False, so the warm-up period stays flat
+    return (fast_mean > slow_mean).astype(np.float64)
+
+
+def momentum(close, params):
+    """Long while the return over ``lookback`` bars exceeds ``threshold``."""
+    close = np.asarray(close, dtype=np.float64)
+    signal = np.zeros((len(close), len(params)))
+    for j, p in enumerate(params):
+        lookback = p["lookback"]
+        if lookback < len(close):
+            change = close[lookback:] / close[:-lookback] - 1
+            signal[lookback:, j] = change > p.get("threshold", 0.0)
+    return signal
+
+
+STRATEGIES = {
+    "sma": sma_crossover,
+    "momentum": momentum,
+}
+
+
+def backtest(close, signal, commission=0.0, slippage=0.0, initial_cash=10000.0):
+    """Equity curves for every signal column.
+
+    A signal computed from a bar's close is traded at that close and held
+    through the next bar (``position[t] = signal[t - 1]``), so a bar's
+    return is earned only by signals from before it. ``commission`` and
+    ``slippage`` are fractions of the traded value, charged on every change
+    of position.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    signal = np.asarray(signal, dtype=np.float64)
+    if signal.ndim == 1:
+        signal = signal[:, None]
+
+    position = np.zeros_like(signal)
+    position[1:] = signal[:-1]
+    returns = np.zeros(len(close))
+    returns[1:] = close[1:] / close[:-1] - 1
+    turnover = np.abs(np.diff(position, axis=0, prepend=0.0))
+
+    strategy_returns = position * returns[:, None] - turnover * (commission + slippage)
+    return initial_cash * np.cumprod(1 + strategy_returns, axis=0), position
+
+
+def stats(equity, position, periods_per_year=TRADING_DAYS):
+    """Summary statistics per equity column, as a dict of arrays."""
+    equity = np.asarray(equity, dtype=np.float64)
+    returns = equity[1:] / equity[:-1] - 1
+    years = max((len(equity) - 1) / periods_per_year, 1e-9)
+    total_return = equity[-1] / equity[0] - 1
+    volatility = returns.std(axis=0) * np.sqrt(periods_per_year)
+    mean = returns.mean(axis=0) * periods_per_year
+    peaks = np.maximum.accumulate(equity, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(volatility > 0, mean / volatility, 0.0)
+    return {
+        "total_return": total_return,
+        "cagr": np.maximum(1 + total_return, 0) ** (1 / years) - 1,
+        "volatility": volatility,
+        "sharpe": sharpe,
+        "max_drawdown": (equity / peaks - 1).min(axis=0),
+        "trades": (np.abs(np.diff(position, axis=0)) > 0).sum(axis=0),
+        "exposure": position.mean(axis=0),
+    }
+
+
+def expand_grid(grid):
+    """Every combination of a ``{name: values}`` grid, as a list of dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_strategy(close, strategy, params, commission=0.0, slippage=0.0, initial_cash=10000.0):
+    """Backtest every parameter set on one symbol; returns a BacktestResult."""
+    signal = STRATEGIES[strategy](close, params)
+    equity, position = backtest(close, signal, commission, slippage, initial_cash)
+    return BacktestResult(params, equity, stats(equity, position))
+
+
+def _sweep_symbol(symbol, close, strategy, params, commission, slippage, initial_cash):
+    result = run_strategy(close, strategy, params, commission, slippage, initial_cash)
+    frame = pd.DataFrame(params)
+    for name, values in result.stats.items():
+        frame[name] = values
+    frame.insert(0, "symbol", symbol)
+    best = int(np.argmax(result.stats["sharpe"]))
+    return frame, result.equity[:, best]
+
+
+def sweep(closes, strategy, grid, commission=0.0, slippage=0.0, initial_cash=10000.0, workers=None):
+    """Backtest a parameter grid on many symbols across a process pool.
+
+    ``closes`` maps symbol to a close-price array. Returns ``(stats, curves)``:
+    a frame with one row per (symbol, parameter set) and the equity curve of
+    each symbol's best parameter set by Sharpe ratio.
+    """
+    params = expand_grid(grid)
+    if strategy == "sma":
+        params = [p for p in params if p["fast"] < p["slow"]]
+    if not params:
+        raise ValueError("The parameter grid is empty.")
+
+    frames, curves = [], {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {
+            symbol: executor.submit(
+                _sweep_symbol, symbol, close, strategy, params, commission, slippage, initial_cash
+            )
+            for symbol, close in closes.items()
+        }
+        for symbol, future in futures.items():
+            frame, curve = future.result()
+            frames.append(frame)
+            curves[symbol] = curve
+    return pd.concat(frames, ignore_index=True), curves
+
+
+def load_closes(symbols, start=START, provider_name=None):
+    """Daily closes from the local OHLCV store, topped up from the provider."""
+    import market_data
+    from ohlcv_store import OHLCVStore
+
+    store = OHLCVStore()
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    try:
+        store.update(market_data.get_provider(provider_name), symbols, "1d", start, today)
+    except Exception:
+        pass  # backtest whatever is stored
+    closes = {}
+    for symbol in symbols:
+        data = store.read_frame(symbol, "1d", start=start)
+        if not data.empty:
+            closes[symbol] = data["Close"].to_numpy(dtype=np.float64)
+    return closes
+
+
+def parse_values(spec, cast=int):
+    """``"5:50:5"`` (inclusive range) or ``"5,10,20"``."""
+    if ":" in spec:
+        start, stop, step = (cast(part) for part in spec.split(":"))
+        return list(np.arange(start, stop + step / 2, step).astype(type(start)).tolist())
+    return [cast(part) for part in spec.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("symbols", nargs="*", help="defaults to the web app's STOCK_SYMBOLS")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="sma")
+    parser.add_argument("--fast", default="5:50:5", help="sma: fast windows")
+    parser.add_argument("--slow", default="20:200:10", help="sma: slow windows")
+    parser.add_argument("--lookback", default="5:120:5", help="momentum: lookbacks")
+    parser.add_argument("--threshold", default="0", help="momentum: minimum return")
+    parser.add_argument("--commission", type=float, default=0.0005)
+    parser.add_argument("--slippage", type=float, default=0.0005)
+    parser.add_argument("--start", default=START)
+    parser.add_argument("--provider", default=None, help="yfinance or fake")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if not symbols:
+        symbols = STOCK_SYMBOLS
+
+    if args.strategy == "sma":
+        grid = {"fast": parse_values(args.fast), "slow": parse_values(args.slow)}
+    else:
+        grid = {"lookback": parse_values(args.lookback), "threshold": parse_values(args.threshold, float)}
+
+    closes = load_closes(symbols, args.start, args.provider)
+    started = time.time()
+    results, _ = sweep(closes, args.strategy, grid, args.commission, args.slippage, workers=args.workers)
+    print(results.sort_values("sharpe", ascending=False).head(args.top).to_string(index=False))
+    print(f"{len(results)} backtests in {time.time() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import datetime
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lazy_imports import lazy_import
+from symbols import STOCK_SYMBOLS
+
+np = lazy_import("numpy")
+
+DEFAULT_ROOT = os.environ.get(
+    "FORECAST_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "forecasts")
+)
+START = "2019-01-01"
+MAX_YEARS = 4
+FIELDS = ["yhat", "yhat_lower", "yhat_upper", "trend", "weekly", "yearly"]
+
+# Forecasts older than this are reported as stale
+STALE_AFTER = 36 * 3600
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def forecast_path(symbol, root=DEFAULT_ROOT):
+    return os.path.join(root, f"{symbol}.npz")
+
+
+def compute_forecast(symbol, root=DEFAULT_ROOT, years=MAX_YEARS, provider_name=None):
+    """Fit (or reuse) the symbol's model and store its future forecast."""
+    # Heavy imports stay out of the web app unless a fallback compute is needed
+    import market_data
+    from model_registry import ModelRegistry, PROPHET_PARAMS
+    from ohlcv_store import OHLCVStore
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+    store = OHLCVStore()
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    try:
+        store.update(market_data.get_provider(provider_name), [symbol], "1d", START, today)
+    except Exception:
+        pass
+    data = store.read_frame(symbol, "1d", start=START)
+    if data.empty:
+        raise LookupError(f"No history available for {symbol}")
+
+    df_train = data["Close"].rename("y").rename_axis("ds").reset_index()
+    m, model_key = ModelRegistry().get_or_fit(symbol, df_train, PROPHET_PARAMS)
+    future = m.make_future_dataframe(periods=years * 365, freq="D", include_history=False)
+    forecast = m.predict(future)
+
+    os.makedirs(root, exist_ok=True)
+    arrays = {
+        field: forecast[field].to_numpy(dtype=np.float32)
+        for field in FIELDS
+        if field in forecast
+    }
+    path = forecast_path(symbol, root)
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(
+        tmp_path,
+        ds=forecast["ds"].to_numpy(dtype="datetime64[D]"),
+        generated_at=np.float64(time.time()),
+        last_bar=np.datetime64(data.index[-1], "D"),
+        model_key=np.str_(model_key),
+        **arrays,
+    )
+    os.replace(tmp_path, path)
+    return symbol, len(forecast)
+
+
+def load_forecast(symbol, root=DEFAULT_ROOT):
+    """Return the stored forecast for ``symbol`` (cached until the file changes)."""
+    path = forecast_path(symbol, root)
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with np.load(path) as npz:
+        data = {name: npz[name] for name in npz.files}
+    with _loaded_lock:
+        _loaded[path] = (mtime, data)
+    return data
+
+
+def forecast_payload(symbol, data, years):
+    days = min(years, MAX_YEARS) * 365
+    age = time.time() - float(data["generated_at"])
+    payload = {
+        "symbol": symbol,
+        "generated_at": datetime.datetime.fromtimestamp(float(data["generated_at"])).isoformat(),
+        "age_seconds": round(age),
+        "stale": age > STALE_AFTER,
+        "last_bar": str(data["last_bar"]),
+        "years": years,
+        "ds": np.datetime_as_string(data["ds"][:days]).tolist(),
+    }
+    for field in FIELDS:
+        if field in data:
+            payload[field] = np.round(data[field][:days].astype(np.float64), 4).tolist()
+    return payload
+
+
+def run(symbols, root=DEFAULT_ROOT, workers=None, provider_name=None):
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(compute_forecast, symbol, root, MAX_YEARS, provider_name): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                _, rows = future.result()
+                print(f"{symbol}: {rows} days forecast")
+            except Exception as e:
+                print(f"{symbol}: failed ({e})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute Prophet forecasts for the symbol universe.")
+    parser.add_argument("symbols", nargs="*", help="defaults to the web app's STOCK_SYMBOLS")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("--provider", default=None, help="yfinance or fake")
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if not symbols:
+        symbols = STOCK_SYMBOLS
+
+    started = time.time()
+    run(symbols, args.root, args.workers, args.provider)
+    print(f"Done in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Throughput benchmark for the vectorized backtester.
+
+Sweeps an SMA-crossover grid over every symbol in the web app's universe on
+synthetic daily history (the fake market data provider, so no network):
+
+    python benchmarks/bench_backtest.py --years 10 --workers 4
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest  # noqa: E402
+import market_data  # noqa: E402
+from symbols import STOCK_SYMBOLS  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--fast", default="2:60:2")
+    parser.add_argument("--slow", default="10:250:10")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    end = datetime.datetime(2024, 1, 1)
+    start = end - datetime.timedelta(days=365 * args.years)
+    bars = market_data.FakeProvider().fetch_ohlcv(STOCK_SYMBOLS, start, end, "1d")
+    closes = {symbol: frame["Close"].to_numpy() for symbol, frame in bars.items()}
+    grid = {"fast": backtest.parse_values(args.fast), "slow": backtest.parse_values(args.slow)}
+
+    started = time.perf_counter()
+    results, curves = backtest.sweep(closes, "sma", grid, commission=0.0005, slippage=0.0005, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    per_symbol = len(results) // len(closes)
+    n_bars = len(next(iter(closes.values())))
+    print(f"{len(closes)} symbols x {per_symbol} parameter sets x {n_bars} bars in {elapsed:.2f}s")
+    print(f"{len(results) / elapsed:,.0f} backtests/sec, {len(results) * n_bars / elapsed / 1e6:,.1f}M bar-evaluations/sec")
+    best = results.sort_values("sharpe", ascending=False).groupby("symbol").head(1)
+    print(best.head(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Bytes on the wire and latency for the page routes.
+
+Renders each page through the Flask test client against a temporary SQLite
+database and the fake market data provider. Every page is fetched three ways:
+without compression, with ``Accept-Encoding: gzip, br``, and as a browser
+revalidation that sends back the ETag it was given:
+
+    python benchmarks/bench_http.py --requests 200
+
+Run it before and after a change to compare; results can be saved with
+``--output`` and compared with ``--compare``.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (name, method, path, form data, logged in)
+PAGES = [
+    ("landing", "GET", "/", None, False),
+    ("home", "GET", "/home", None, False),
+    ("trade", "GET", "/trade", None, True),
+    ("news", "GET", "/news", None, False),
+    ("market_trends", "GET", "/market/trends", None, False),
+    ("stock_page", "POST", "/get_stock_price", {"symbol": "AAPL"}, True),
+    ("chart", "GET", "/chart/AAPL", None, True),
+    ("static_css", "GET", None, None, False),
+]
+
+
+def configure_environment(tmp):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'http.db')}"
+    os.environ["MARKET_DATA_PROVIDER"] = "fake"
+    os.environ["OHLCV_STORE_DIR"] = os.path.join(tmp, "ohlcv")
+    # Refused at once, leaving the news page empty but rendered
+    os.environ["NEWS_FEED_URL"] = "http://127.0.0.1:9/rss"
+
+
+def static_path():
+    styles = os.path.join(ROOT, "static", "styles")
+    name = sorted(os.listdir(styles))[0]
+    return f"/static/styles/{name}"
+
+
+def measure(client, method, path, data, headers, n):
+    latencies = []
+    response = None
+    for _ in range(n):
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data, headers=headers)
+        response.get_data()
+        latencies.append(time.perf_counter() - started)
+        response.close()
+    return response, latencies
+
+
+def summarize(response, latencies):
+    return {
+        "status": response.status_code,
+        "bytes": len(response.get_data()),
+        "encoding": response.headers.get("Content-Encoding"),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="requests per page and variant")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(tmp)
+        from app import app, bcrypt, db, User
+
+        with app.app_context():
+            db.create_all()
+            user = User(username="httpbench", password=bcrypt.generate_password_hash("x").decode("utf-8"))
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        anonymous = app.test_client()
+        logged_in = app.test_client()
+        with logged_in.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+        # Let the background snapshot fill so pages render from it
+        logged_in.get("/trade")
+        time.sleep(1)
+
+        results = {}
+        for name, method, path, data, login in PAGES:
+            client = logged_in if login else anonymous
+            path = path or static_path()
+            row = {}
+            response, latencies = measure(client, method, path, data, {}, args.requests)
+            row["identity"] = summarize(response, latencies)
+            response, latencies = measure(client, method, path, data, {"Accept-Encoding": "gzip, br"}, args.requests)
+            row["compressed"] = summarize(response, latencies)
+            etag = response.headers.get("ETag")
+            if etag and method == "GET":
+                headers = {"Accept-Encoding": "gzip, br", "If-None-Match": etag}
+                response, latencies = measure(client, method, path, data, headers, args.requests)
+                row["revalidated"] = summarize(response, latencies)
+            row["cache_control"] = response.headers.get("Cache-Control")
+            results[name] = row
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{'page':<15}{'variant':<13}{'status':>7}{'bytes':>10}{'p50 ms':>9}{'p95 ms':>9}  encoding")
+    for name, row in results.items():
+        for variant in ("identity", "compressed", "revalidated"):
+            if variant not in row:
+                continue
+            r = row[variant]
+            line = (
+                f"{name:<15}{variant:<13}{r['status']:>7}{r['bytes']:>10}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                f"  {r['encoding'] or '-'}"
+            )
+            old = (baseline or {}).get(name, {}).get(variant)
+            if old:
+                line += f"  (was {old['bytes']} B, {old['p50_ms']:.2f} ms)"
+            print(line)
+        print(f"{'':<15}Cache-Control: {row['cache_control']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
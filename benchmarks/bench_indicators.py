@@ -0,0 +1,129 @@
+"""Cost per bar of the technical indicators: vectorized, incremental and naive.
+
+Uses synthetic 5-minute bars for one symbol (the fake market data provider, so
+no network) and times three ways of keeping SMA/EMA/RSI/MACD/Bollinger/VWAP
+current:
+
+- vectorized: ``indicators.compute`` over the whole history (the first load)
+- incremental: the engine loaded with all but ``--updates`` bars, then fed
+  the rest one bar at a time (what each new bar costs afterwards)
+- naive: recomputing everything with pandas rolling/ewm after every new bar
+
+    python benchmarks/bench_indicators.py --days 120 --updates 1000
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import indicators  # noqa: E402
+import market_data  # noqa: E402
+
+
+def naive_pandas(frame, params=indicators.DEFAULT_PARAMS):
+    """Every indicator from scratch with pandas, as a dashboard script would."""
+    close = frame["Close"]
+    out = {
+        "sma": close.rolling(params["sma"]).mean(),
+        "ema": close.ewm(span=params["ema"], adjust=False).mean(),
+    }
+    n = params["rsi"]
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / n, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / n, adjust=False).mean()
+    out["rsi"] = 100 - 100 / (1 + gain / loss)
+    fast, slow, signal = params["macd"]
+    line = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+    out["macd"] = line
+    out["macd_signal"] = line.ewm(span=signal, adjust=False).mean()
+    out["macd_hist"] = line - out["macd_signal"]
+    n_bb, k = params["bollinger"]
+    std = close.rolling(n_bb).std(ddof=0)
+    out["bb_middle"] = close.rolling(n_bb).mean()
+    out["bb_upper"] = out["bb_middle"] + k * std
+    out["bb_lower"] = out["bb_middle"] - k * std
+    typical = (frame["High"] + frame["Low"] + close) / 3
+    session = frame.index.normalize()
+    out["vwap"] = (typical * frame["Volume"]).groupby(session).cumsum() / frame["Volume"].groupby(session).cumsum()
+    return out
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbol", default="AAPL")
+    parser.add_argument("--days", type=int, default=60, help="days of 5-minute bars")
+    parser.add_argument("--updates", type=int, default=1000, help="bars fed one at a time to the engine")
+    parser.add_argument("--naive", type=int, default=50, help="bars timed with the naive pandas path")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    end = datetime.datetime(2024, 1, 1)
+    frame = market_data.FakeProvider().fetch_ohlcv([args.symbol], end - datetime.timedelta(days=args.days), end, "5m")
+    frame = frame[args.symbol]
+    ts, high, low, close, volume = indicators.frame_arrays(frame)
+    n_bars = len(ts)
+    updates = min(args.updates, n_bars - 1)
+    print(f"{args.symbol}: {n_bars} bars of 5m")
+
+    vectorized = best_of(lambda: indicators.compute(ts, high, low, close, volume), args.repeat)
+    print(f"{'vectorized':<12}{vectorized * 1000:10.2f} ms for the full history ({vectorized / n_bars * 1e9:,.0f} ns/bar)")
+
+    def incremental():
+        engine = indicators.IndicatorEngine()
+        split = n_bars - updates
+        engine.update("bench", ts[:split], high[:split], low[:split], close[:split], volume[:split])
+        started = time.perf_counter()
+        for i in range(split, n_bars):
+            j = i + 1
+            series = engine.update("bench", ts[i:j], high[i:j], low[i:j], close[i:j], volume[i:j])
+        return time.perf_counter() - started, series
+
+    per_bar = []
+    for _ in range(args.repeat):
+        elapsed, series = incremental()
+        per_bar.append(elapsed / updates)
+    print(f"{'incremental':<12}{min(per_bar) * 1e6:10.2f} us per new bar (median {statistics.median(per_bar) * 1e6:.2f} us)")
+
+    naive_bars = min(args.naive, n_bars)
+    started = time.perf_counter()
+    for i in range(n_bars - naive_bars, n_bars):
+        naive_pandas(frame.iloc[: i + 1])
+    naive = (time.perf_counter() - started) / naive_bars
+    print(f"{'naive pandas':<12}{naive * 1e3:10.2f} ms per new bar")
+    print(f"incremental is {naive / min(per_bar):,.0f}x faster per bar than recomputing with pandas")
+
+    # The incremental values must match a full recompute, up to the 6-decimal
+    # rounding of the JSON payload
+    expected = indicators.compute(ts, high, low, close, volume)
+    reference = naive_pandas(frame)
+    got = series.since()
+    worst = worst_pandas = 0.0
+    for name in indicators.OUTPUTS:
+        values = np.array([np.nan if v is None else v for v in got[name]])
+        tail = slice(n_bars - len(values), n_bars)
+        finite = ~np.isnan(values)
+        worst = max(worst, float(np.max(np.abs(values[finite] - expected[name][tail][finite]), initial=0.0)))
+        ref = reference[name].to_numpy()[tail]
+        both = finite & ~np.isnan(ref)
+        scale = np.maximum(np.abs(ref[both]), 1.0)
+        worst_pandas = max(worst_pandas, float(np.max(np.abs(values[both] - ref[both]) / scale, initial=0.0)))
+    print(f"max abs difference vs vectorized: {worst:.2e}; max relative difference vs pandas: {worst_pandas:.2e}")
+
+
+if __name__ == "__main__":
+    main()
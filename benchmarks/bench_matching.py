@@ -0,0 +1,85 @@
+"""Latency benchmark for the in-memory matching engine.
+
+Submits a random mix of limit, market and IOC orders (plus cancels) around
+a mid price with no database behind the engine, then reports submit latency
+percentiles and sustained orders/sec per symbol:
+
+    python benchmarks/bench_matching.py --orders 200000 --symbols 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matching_engine  # noqa: E402
+from matching_engine import BUY, GTC, IOC, LIMIT, MARKET, SELL  # noqa: E402
+
+MID = 100.0
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run(symbol, orders, seed, cancel_ratio):
+    engine = matching_engine.MatchingEngine()
+    rng = random.Random(seed)
+    latencies = []
+    open_ids = []
+    fills = 0
+
+    started = time.perf_counter()
+    for _ in range(orders):
+        if open_ids and rng.random() < cancel_ratio:
+            order_id = open_ids.pop(rng.randrange(len(open_ids)))
+            t0 = time.perf_counter_ns()
+            engine.cancel(order_id)
+            latencies.append(time.perf_counter_ns() - t0)
+            continue
+
+        side = rng.choice((BUY, SELL))
+        quantity = rng.randint(1, 100)
+        roll = rng.random()
+        if roll < 0.05:
+            kind, tif, price = MARKET, IOC, None
+        else:
+            kind, tif = LIMIT, IOC if roll < 0.15 else GTC
+            # Tick-rounded prices around the mid so levels build up and cross
+            price = round(MID + rng.gauss(0, 0.5), 2)
+
+        t0 = time.perf_counter_ns()
+        order, order_fills = engine.submit(1, symbol, side, quantity, price, kind=kind, tif=tif)
+        latencies.append(time.perf_counter_ns() - t0)
+        fills += len(order_fills)
+        if order.status in ("OPEN", "PARTIAL"):
+            open_ids.append(order.id)
+    elapsed = time.perf_counter() - started
+
+    book = engine.book(symbol)
+    return latencies, elapsed, fills, len(book.orders)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100000, help="operations per symbol")
+    parser.add_argument("--symbols", type=int, default=2)
+    parser.add_argument("--cancel-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for i in range(args.symbols):
+        symbol = f"SYM{i}"
+        latencies, elapsed, fills, resting = run(symbol, args.orders, args.seed + i, args.cancel_ratio)
+        latencies.sort()
+        stats = ", ".join(
+            f"p{label} {percentile(latencies, fraction) / 1000:.1f}us"
+            for label, fraction in (("50", 0.5), ("90", 0.9), ("99", 0.99), ("99.9", 0.999))
+        )
+        print(f"{symbol}: {args.orders / elapsed:,.0f} ops/sec, {fills} fills, {resting} resting; {stats}")
+
+
+if __name__ == "__main__":
+    main()
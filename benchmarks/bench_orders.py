@@ -0,0 +1,181 @@
+"""Concurrency benchmark for the order execution path.
+
+Runs random buy/sell orders from several processes (each with several
+threads) against a temporary SQLite database, reports orders/sec and then
+checks that no funds or shares were created from nothing:
+
+    python benchmarks/bench_orders.py --processes 4 --threads 4 --orders 2000
+
+With ``--batch-size N`` each thread submits its orders for one user at a
+time through the bulk path (``orders.execute_batch``):
+
+    python benchmarks/bench_orders.py --processes 1 --threads 1 --orders 20000 --batch-size 500
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+import orders  # noqa: E402
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA"]
+START_FUNDS = 10000.0
+
+
+def create_schema(url, users):
+    os.environ["DATABASE_URL"] = url
+    from app import app, db, User
+
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(
+            User,
+            [{"username": f"bench{i}", "password": "x", "funds": START_FUNDS} for i in range(users)],
+        )
+        db.session.commit()
+
+
+def random_order(rng):
+    return {
+        "symbol": rng.choice(SYMBOLS),
+        "side": rng.choice(("BUY", "SELL")),
+        "quantity": rng.randint(1, 20),
+        "price": round(rng.uniform(50, 150), 2),
+    }
+
+
+def worker(url, users, orders_per_thread, threads, seed, batch_size, results):
+    engine = create_engine(url)
+    orders.configure_sqlite(engine)
+    counts = {"accepted": 0, "rejected": 0}
+    lock = threading.Lock()
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        accepted = rejected = 0
+        if batch_size > 1:
+            for start in range(0, orders_per_thread, batch_size):
+                batch = [random_order(rng) for _ in range(min(batch_size, orders_per_thread - start))]
+                batch_results, _, _ = orders.execute_batch(engine, rng.randint(1, users), batch)
+                filled = sum(1 for result in batch_results if result["ok"])
+                accepted += filled
+                rejected += len(batch_results) - filled
+        else:
+            for _ in range(orders_per_thread):
+                # Few users and symbols so orders contend on the same rows
+                order = random_order(rng)
+                result = orders.execute_order(
+                    engine, rng.randint(1, users), order["symbol"], order["side"], order["quantity"], order["price"]
+                )
+                if result.ok:
+                    accepted += 1
+                else:
+                    rejected += 1
+        with lock:
+            counts["accepted"] += accepted
+            counts["rejected"] += rejected
+
+    pool = [threading.Thread(target=run, args=(seed * 1000 + i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(counts)
+
+
+def check_invariants(url, users):
+    engine = create_engine(url)
+    problems = []
+    with engine.connect() as conn:
+        funds = dict(conn.execute(text('SELECT id, funds FROM "user"')).all())
+        cash_flow = dict(
+            conn.execute(
+                text(
+                    "SELECT user_id, SUM(CASE WHEN transaction_type = 'BUY' THEN -price * quantity "
+                    "ELSE price * quantity END) FROM stock_transaction GROUP BY user_id"
+                )
+            ).all()
+        )
+        ledger = {
+            (user_id, symbol): quantity
+            for user_id, symbol, quantity in conn.execute(
+                text(
+                    "SELECT user_id, stock_symbol, SUM(CASE WHEN transaction_type = 'BUY' THEN quantity "
+                    "ELSE -quantity END) FROM stock_transaction GROUP BY user_id, stock_symbol"
+                )
+            )
+        }
+        holdings = {
+            (user_id, symbol): quantity
+            for user_id, symbol, quantity in conn.execute(
+                text("SELECT user_id, stock_symbol, quantity FROM holding")
+            )
+        }
+
+    for user_id in range(1, users + 1):
+        expected = START_FUNDS + cash_flow.get(user_id, 0.0)
+        if funds[user_id] < -1e-6:
+            problems.append(f"user {user_id} has negative funds {funds[user_id]}")
+        if abs(funds[user_id] - expected) > 1e-4:
+            problems.append(f"user {user_id} funds {funds[user_id]} != ledger {expected}")
+    for key in set(ledger) | set(holdings):
+        if ledger.get(key, 0) < 0:
+            problems.append(f"{key} sold more shares than bought: {ledger[key]}")
+        if ledger.get(key, 0) != holdings.get(key, 0):
+            problems.append(f"{key} holding {holdings.get(key, 0)} != ledger {ledger.get(key, 0)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=500, help="orders per thread")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1, help="orders per bulk submission")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        create_schema(url, args.users)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(url, args.users, args.orders, args.threads, seed, args.batch_size, results),
+            )
+            for seed in range(args.processes)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        counts = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        total = args.processes * args.threads * args.orders
+        accepted = sum(c["accepted"] for c in counts)
+        print(f"{total} orders from {args.processes} processes x {args.threads} threads in {elapsed:.2f}s")
+        print(f"{total / elapsed:,.0f} orders/sec ({accepted} filled, {total - accepted} rejected)")
+
+        problems = check_invariants(url, args.users)
+        if problems:
+            print(f"FAILED: {len(problems)} invariant violations")
+            for problem in problems[:20]:
+                print("  " + problem)
+            raise SystemExit(1)
+        print("OK: funds and shares reconcile with the ledger; nothing was created from nothing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Monte Carlo VaR/CVaR throughput by chunk size and worker count.
+
+Simulates an equally weighted portfolio of the web app's first ``--assets``
+symbols from synthetic daily history (the fake market data provider, so no
+network):
+
+    python benchmarks/bench_risk.py --assets 20 --paths 100000 --horizon 10
+    python benchmarks/bench_risk.py --workers 1,2,4 --chunk-mb 8,32,128
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import market_data  # noqa: E402
+import risk  # noqa: E402
+from symbols import STOCK_SYMBOLS  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--assets", type=int, default=20)
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--horizon", type=int, default=10, help="trading days")
+    parser.add_argument("--workers", default="1", help="comma-separated process counts")
+    parser.add_argument("--chunk-mb", default="32", help="comma-separated chunk sizes in MiB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    symbols = STOCK_SYMBOLS[: args.assets]
+    closes = risk.load_closes(symbols, market_data.FakeProvider(), end=datetime.datetime(2024, 1, 1))
+    positions = {symbol: 10_000.0 for symbol in symbols}
+    print(f"{len(symbols)} assets, {args.paths:,} paths, {args.horizon}-day horizon, "
+          f"{len(closes) - 1} daily returns")
+
+    print(f"{'workers':>8}{'chunk MiB':>11}{'best s':>9}{'paths/s':>12}  VaR 99%      CVaR 99%")
+    for workers in (int(w) for w in args.workers.split(",")):
+        for chunk_mb in (int(c) for c in args.chunk_mb.split(",")):
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                summary = risk.portfolio_risk(
+                    positions, closes, args.paths, args.horizon, workers=workers, chunk_bytes=chunk_mb * 1024 * 1024
+                )
+                timings.append(time.perf_counter() - started)
+            best = min(timings)
+            print(
+                f"{workers:>8}{chunk_mb:>11}{best:>9.3f}{args.paths / best:>12,.0f}"
+                f"  {summary['var']['99']:>11,.2f}  {summary['cvar']['99']:>11,.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
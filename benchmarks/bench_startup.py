@@ -0,0 +1,112 @@
+"""Startup benchmark: import time and time to the first request.
+
+Each run starts a fresh interpreter with ``-X importtime``, imports the app,
+and serves ``GET /login`` through the test client, against a temporary
+SQLite database and the fake market data provider:
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --warm   # with WARM_UP=1 (preload)
+
+Prints the median import time, time to the first response and process wall
+time, then the modules with the largest cumulative import time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+sys.stderr.write("IMPORTED\\n")
+response = app.test_client().get("/login")
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print("RESULT", json.dumps({"import_s": imported - started, "first_request_s": served - started,
+                  "modules": len(sys.modules)}))
+"""
+
+
+def parse_importtime(stderr):
+    """Cumulative import seconds per top-level package.
+
+    Lines look like "import time: self [us] | cumulative | imported package".
+    A package's first (outermost) import covers its submodules, so the
+    largest cumulative time seen for the package is its cost. Packages
+    imported by other packages are also counted inside their importer.
+    """
+    cumulative = {}
+    # Stop at the child's marker: later imports come from the first request
+    # and the background refresh threads it starts
+    for line in stderr.partition("IMPORTED\n")[0].splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        cumulative[package] = max(cumulative.get(package, 0.0), int(cum) / 1e6)
+    return cumulative
+
+
+def run_once(env):
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    # Background threads may print too; the child's result line is tagged
+    line = next(line for line in proc.stdout.splitlines() if line.startswith("RESULT "))
+    result = json.loads(line[len("RESULT "):])
+    result["wall_s"] = wall
+    result["imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm", action="store_true", help="set WARM_UP=1 (preload heavy modules at startup)")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+            MARKET_DATA_PROVIDER="fake",
+            OHLCV_STORE_DIR=os.path.join(tmp, "ohlcv"),
+            # Refused at once; the feed refreshes in the background anyway
+            NEWS_FEED_URL="http://127.0.0.1:9/rss",
+            WARM_UP="1" if args.warm else "0",
+        )
+        runs = [run_once(env) for _ in range(args.runs)]
+
+    for key, label in (("import_s", "import app"), ("first_request_s", "first response"), ("wall_s", "process wall")):
+        values = [run[key] for run in runs]
+        print(f"{label:<16}median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms")
+    print(f"{'modules loaded':<16}{runs[-1]['modules']}")
+
+    imports = defaultdict(list)
+    for run in runs:
+        for name, seconds in run["imports"].items():
+            imports[name].append(seconds)
+    ranked = sorted(imports.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    print(f"\nPackages by cumulative time during 'import app' (median of {args.runs} runs):")
+    for name, values in ranked[: args.top]:
+        print(f"  {statistics.median(values) * 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
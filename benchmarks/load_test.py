@@ -0,0 +1,293 @@
+"""Load test for the Flask routes.
+
+Starts the app in-process on a temporary SQLite database with the fake
+market data provider and the local news fixture (no network needed). It
+seeds users with transaction history, then drives a weighted mix of routes
+from concurrent logged-in clients:
+
+    python benchmarks/load_test.py --users 200 --transactions 50 --concurrency 16 --duration 30
+
+Throughput and p50/p95/p99 latency per route are printed and saved as JSON
+(``--output``, default under benchmarks/results/). ``--compare`` prints the
+change against an earlier result file.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "fixtures"))
+
+import numpy as np  # noqa: E402
+import requests  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+PASSWORD = "loadtest"
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA"]
+
+# Route mix: name -> weight
+DEFAULT_MIX = {
+    "get_stock_price": 40,
+    "buy_stock": 15,
+    "sell_stock": 10,
+    "portfolio": 25,
+    "login": 5,
+    "admin": 5,
+}
+
+
+def configure_environment(tmp, market_refresh):
+    import news_server
+
+    news = news_server.serve(port=0)
+    threading.Thread(target=news.serve_forever, daemon=True).start()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+    os.environ["MARKET_DATA_PROVIDER"] = "fake"
+    os.environ["MARKET_DATA_REFRESH"] = str(market_refresh)
+    os.environ["OHLCV_STORE_DIR"] = os.path.join(tmp, "ohlcv")
+    os.environ["NEWS_FEED_URL"] = f"http://127.0.0.1:{news.server_address[1]}/rss"
+
+
+def seed(users, transactions, seed_value):
+    """Create users (one shared bcrypt hash) with buy-only histories."""
+    from app import app, bcrypt, db, Holding, StockTransaction, User
+
+    rng = random.Random(seed_value)
+    password = bcrypt.generate_password_hash(PASSWORD).decode("utf-8")
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(
+            User, [{"username": f"load{i}", "password": password, "funds": 1e6} for i in range(users)]
+        )
+        db.session.commit()
+        ids = [user_id for (user_id,) in db.session.query(User.id)]
+        rows = []
+        holdings = {}
+        for user_id in ids:
+            for _ in range(transactions):
+                symbol = rng.choice(SYMBOLS)
+                quantity = rng.randint(1, 20)
+                price = round(rng.uniform(50, 500), 2)
+                rows.append(
+                    {"user_id": user_id, "stock_symbol": symbol, "quantity": quantity, "price": price, "transaction_type": "BUY"}
+                )
+                position = holdings.setdefault((user_id, symbol), [0, 0.0])
+                position[0] += quantity
+                position[1] += quantity * price
+        db.session.bulk_insert_mappings(StockTransaction, rows)
+        db.session.bulk_insert_mappings(
+            Holding,
+            [
+                {"user_id": user_id, "stock_symbol": symbol, "quantity": quantity, "cost_basis": cost}
+                for (user_id, symbol), (quantity, cost) in holdings.items()
+            ],
+        )
+        db.session.commit()
+    return len(ids)
+
+
+def start_server():
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class Client:
+    """One simulated browser session."""
+
+    def __init__(self, base, username, rng):
+        self.base = base
+        self.username = username
+        self.rng = rng
+        self.session = requests.Session()
+        self.admin_session = None
+
+    def login(self):
+        return self.session.post(f"{self.base}/login", data={"username": self.username, "password": PASSWORD})
+
+    def get_stock_price(self):
+        return self.session.post(f"{self.base}/get_stock_price", data={"symbol": self.rng.choice(SYMBOLS)})
+
+    def _trade(self, path):
+        # The form flow: post, then follow the 307 back to the stock page
+        data = {"symbol": self.rng.choice(SYMBOLS), "price": "100", "quantity": str(self.rng.randint(1, 5))}
+        return self.session.post(f"{self.base}/{path}", data=data)
+
+    def buy_stock(self):
+        return self._trade("buy_stock")
+
+    def sell_stock(self):
+        return self._trade("sell_stock")
+
+    def portfolio(self):
+        return self.session.get(f"{self.base}/portfolio")
+
+    def admin(self):
+        if self.admin_session is None:
+            self.admin_session = requests.Session()
+            self.admin_session.post(f"{self.base}/admin_login", data={"username": "admin", "password": "admin@123"})
+        return self.admin_session.get(f"{self.base}/admin")
+
+
+def run_load(base, users, mix, concurrency, duration, requests_limit, seed_value):
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    samples = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    counter = iter(range(requests_limit)) if requests_limit else None
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        client = Client(base, f"load{rng.randrange(users)}", rng)
+        client.login()
+        local = {route: [] for route in routes}
+        local_errors = {route: 0 for route in routes}
+        while time.perf_counter() < deadline:
+            if counter is not None:
+                with lock:
+                    if next(counter, None) is None:
+                        break
+            route = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = getattr(client, route)()
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            local[route].append(time.perf_counter() - started)
+            if not ok:
+                local_errors[route] += 1
+        with lock:
+            for route in routes:
+                samples[route].extend(local[route])
+                errors[route] += local_errors[route]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return samples, errors, time.perf_counter() - started
+
+
+def summarize(samples, errors, elapsed):
+    routes = {}
+    for route, latencies in samples.items():
+        if not latencies:
+            continue
+        values = np.array(latencies) * 1000
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors[route],
+            "rps": len(values) / elapsed,
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "p99_ms": float(np.percentile(values, 99)),
+            "mean_ms": float(values.mean()),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {"elapsed_s": elapsed, "requests": total, "rps": total / elapsed, "routes": routes}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result, baseline=None):
+    print(f"{result['requests']} requests in {result['elapsed_s']:.1f}s, {result['rps']:,.1f} req/s")
+    print(f"{'route':<16}{'reqs':>7}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, row in sorted(result["routes"].items()):
+        line = (
+            f"{route:<16}{row['requests']:>7}{row['errors']:>6}{row['rps']:>9.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        )
+        old = (baseline or {}).get("routes", {}).get(route)
+        if old:
+            line += f"  p95 {(row['p95_ms'] / old['p95_ms'] - 1) * 100:+.0f}% vs {baseline.get('commit')}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=50, help="seeded transactions per user")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = no limit)")
+    parser.add_argument("--mix", default=None, help="route weights, e.g. get_stock_price=3,portfolio=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix = {name: float(weight) for name, weight in (item.split("=") for item in args.mix.split(","))}
+        unknown = set(mix) - set(DEFAULT_MIX)
+        if unknown:
+            parser.error(f"unknown routes in --mix: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(tmp, market_refresh=60)
+        users = seed(args.users, args.transactions, args.seed)
+        server, base = start_server()
+        try:
+            samples, errors, elapsed = run_load(
+                base, users, mix, args.concurrency, args.duration, args.requests, args.seed
+            )
+        finally:
+            server.shutdown()
+
+    result = summarize(samples, errors, elapsed)
+    result.update(
+        commit=git_commit(),
+        timestamp=datetime.datetime.now().isoformat(timespec="seconds"),
+        config={
+            "users": args.users,
+            "transactions": args.transactions,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mix": mix,
+            "seed": args.seed,
+        },
+    )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"load-{result['commit'] or 'nogit'}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objs as go
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+PLOTLY_JS_VERSION = get_plotlyjs_version()
+
+_figure_cache = OrderedDict()
+_figure_lock = threading.Lock()
+_plotly_js = None
+FIGURE_CACHE_SIZE = 256
+
+
+def plotly_js():
+    # The bundle ships with plotly.py, so it is read once and served from
+    # memory under a versioned URL that browsers can cache forever.
+    global _plotly_js
+    if _plotly_js is None:
+        _plotly_js = get_plotlyjs()
+    return _plotly_js
+
+
+def build_figure(stock_symbol, data, title):
+    # Determine color based on price movement
+    price_change = data["Close"].iloc[-1] - data["Open"].iloc[0]
+    line_color = "green" if price_change > 0 else "red"
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=data.index, y=data["Close"], mode='lines', line=dict(color=line_color)))
+    fig.update_layout(
+        title=f"{stock_symbol} Performance ({title})",
+        xaxis_title="Time",
+        yaxis_title="Price",
+        template="plotly_dark",
+        paper_bgcolor="rgba(0, 0, 0, 0)",
+        plot_bgcolor="#111",
+        font=dict(color="#fff"),
+        xaxis=dict(
+            gridcolor="#444",
+            linecolor="#444"
+        ),
+        yaxis=dict(
+            gridcolor="#444",
+            linecolor="#444"
+        )
+    )
+    return fig
+
+
+def figure_json(stock_symbol, window, data, title):
+    """Return the figure JSON for ``data``, cached per (symbol, window, last bar)."""
+    key = (stock_symbol, window, data.index[-1], len(data))
+    with _figure_lock:
+        cached = _figure_cache.get(key)
+        if cached is not None:
+            _figure_cache.move_to_end(key)
+            return cached
+
+    payload = build_figure(stock_symbol, data, title).to_json()
+
+    with _figure_lock:
+        _figure_cache[key] = payload
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return payload
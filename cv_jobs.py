@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lazy_imports import lazy_import
+
+pd = lazy_import("pandas")
+diagnostics = lazy_import("prophet.diagnostics")
+serialize = lazy_import("prophet.serialize")
+
+DEFAULT_ROOT = os.environ.get(
+    "CV_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cv")
+)
+
+
+def _run_cutoff(model_json, horizon, cutoff):
+    # Runs in a worker process: one cutoff per task
+    m = serialize.model_from_json(model_json)
+    return diagnostics.cross_validation(m, horizon=horizon, cutoffs=[cutoff], disable_tqdm=True)
+
+
+class CrossValidationJob:
+    """Prophet cross-validation fanned out over a process pool, one cutoff per task."""
+
+    def __init__(self, key, cache_path):
+        self.key = key
+        self.cache_path = cache_path
+        self.total = 0
+        self.completed = 0
+        self.df_cv = None
+        self.df_p = None
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def progress(self):
+        return self.completed / self.total if self.total else 0.0
+
+    def run(self, executor, m, initial, period, horizon):
+        try:
+            initial, period, horizon = pd.Timedelta(initial), pd.Timedelta(period), pd.Timedelta(horizon)
+            cutoffs = diagnostics.generate_cutoffs(m.history, horizon, initial, period)
+            self.total = len(cutoffs)
+            model_json = serialize.model_to_json(m)
+            futures = [executor.submit(_run_cutoff, model_json, horizon, cutoff) for cutoff in cutoffs]
+            frames = []
+            for future in as_completed(futures):
+                frames.append(future.result())
+                self.completed += 1
+            self.df_cv = pd.concat(frames).sort_values(["cutoff", "ds"]).reset_index(drop=True)
+            self.df_p = diagnostics.performance_metrics(self.df_cv)
+            pd.to_pickle((self.df_cv, self.df_p), self.cache_path)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+
+class CrossValidationRunner:
+    """Starts cross-validation jobs in the background and caches their results.
+
+    Results are stored on disk keyed by (model key, initial, period, horizon),
+    so reopening the page with the same model and parameters is instant.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_workers=None):
+        self.root = root
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _key(self, model_key, initial, period, horizon):
+        raw = f"{model_key}|{initial}|{period}|{horizon}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+    def submit(self, m, model_key, initial, period, horizon):
+        """Return the job for these parameters, starting it if needed."""
+        key = self._key(model_key, initial, period, horizon)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.error is None:
+                return job
+
+            os.makedirs(self.root, exist_ok=True)
+            job = CrossValidationJob(key, os.path.join(self.root, f"{key}.pkl"))
+            self._jobs[key] = job
+            if os.path.exists(job.cache_path):
+                job.df_cv, job.df_p = pd.read_pickle(job.cache_path)
+                job.done.set()
+                return job
+
+        threading.Thread(
+            target=job.run,
+            args=(self.executor, m, initial, period, horizon),
+            name=f"cv-{key}",
+            daemon=True,
+        ).start()
+        return job
@@ -0,0 +1,73 @@
+"""Local RSS server for exercising the news feed without network access.
+
+Serves ``news_rss.xml`` with ``ETag``/``Last-Modified`` headers and answers
+conditional requests with 304. ``--delay`` simulates a slow upstream and
+``--fail`` a broken one:
+
+    python fixtures/news_server.py --port 8765
+    NEWS_FEED_URL=http://localhost:8765/rss python app.py
+"""
+import argparse
+import email.utils
+import hashlib
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_rss.xml")
+
+
+def make_handler(path, delay, fail):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            if fail:
+                self.send_error(503)
+                return
+
+            # Re-read on every request so the fixture can be edited live
+            with open(path, "rb") as f:
+                body = f.read()
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            last_modified = email.utils.formatdate(os.path.getmtime(path), usegmt=True)
+
+            if self.headers.get("If-None-Match") == etag or (
+                self.headers.get("If-None-Match") is None
+                and self.headers.get("If-Modified-Since") == last_modified
+            ):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(port=8765, path=FIXTURE, delay=0, fail=False):
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(path, delay, fail))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--delay", type=float, default=0, help="seconds to wait before answering")
+    parser.add_argument("--fail", action="store_true", help="answer every request with 503")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.fixture, args.delay, args.fail)
+    print(f"Serving {args.fixture} on http://127.0.0.1:{args.port}/rss")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
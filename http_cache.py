@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+}
+
+
+class FragmentCache:
+    """Rendered HTML keyed by name, valid while its data version is unchanged.
+
+    Each key holds one version; rendering a new version replaces the old one,
+    so entries don't pile up as the underlying data changes.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (version, html)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, render):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        html = render()
+        with self._lock:
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": 0,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ResponseOptimizer:
+    """Strong ETags with 304s and gzip/brotli compression for buffered responses.
+
+    GET/HEAD 200s without an ETag get one from a hash of the body (plus the
+    chosen encoding, so each representation has its own tag) and answer
+    ``If-None-Match`` with 304 before anything is compressed. Bodies of at
+    least ``min_size`` bytes are compressed when the client accepts it;
+    compressed bodies are kept by content hash up to ``cache_bytes`` so
+    identical pages are compressed once. Streamed responses pass through.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, cache_bytes=16 * 1024 * 1024):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_bytes = cache_bytes
+        self._compressed = OrderedDict()  # (digest, encoding) -> body
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.compressed = 0
+        self.compress_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _encoding(self, request, response, size):
+        if size < self.min_size or "Content-Encoding" in response.headers:
+            return None
+        if response.mimetype not in COMPRESSIBLE:
+            return None
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def _compress(self, digest, body, encoding):
+        key = (digest, encoding)
+        with self._lock:
+            cached = self._compressed.get(key)
+            if cached is not None:
+                self._compressed.move_to_end(key)
+                self.compress_hits += 1
+                return cached
+        if encoding == "br":
+            data = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            data = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        with self._lock:
+            if key not in self._compressed and len(data) <= self.cache_bytes:
+                self._compressed[key] = data
+                self._cached_bytes += len(data)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._compressed.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+        return data
+
+    def process(self, request, response, buffer_files=False):
+        """Add an ETag, answer 304 or compress ``response``.
+
+        File responses are left alone unless ``buffer_files`` (meant for small
+        static assets); their own ETag then gets the encoding appended.
+        """
+        if response.status_code != 200:
+            return response
+        if response.direct_passthrough:
+            if not buffer_files or response.content_length is None or response.content_length > self.cache_bytes:
+                return response
+            response.direct_passthrough = False
+        elif response.is_streamed:
+            return response
+        body = response.get_data()
+        encoding = self._encoding(request, response, len(body))
+        if encoding is not None or response.mimetype in COMPRESSIBLE:
+            response.vary.add("Accept-Encoding")
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+        etag, _ = response.get_etag()
+        if request.method in ("GET", "HEAD") and (etag is None or encoding is not None):
+            if etag is None and "Cache-Control" not in response.headers:
+                # Pages depend on the session: browsers may keep them but
+                # must revalidate, and shared caches must not
+                response.headers["Cache-Control"] = "private, no-cache"
+            tag = etag or digest
+            if encoding is not None:
+                tag = f"{tag}-{encoding}"
+            response.set_etag(tag)
+            if request.if_none_match.contains(tag):
+                # Werkzeug drops the body and entity headers of a 304
+                response.status_code = 304
+                with self._lock:
+                    self.not_modified += 1
+                return response
+
+        if encoding is not None:
+            data = self._compress(digest, body, encoding)
+            response.set_data(data)
+            response.headers["Content-Encoding"] = encoding
+            with self._lock:
+                self.compressed += 1
+                self.bytes_in += len(body)
+                self.bytes_out += len(data)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "brotli": brotli is not None,
+                "not_modified": self.not_modified,
+                "compressed": self.compressed,
+                "compress_cache_hits": self.compress_hits,
+                "compress_cache_bytes": self._cached_bytes,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": self.bytes_out / self.bytes_in if self.bytes_in else None,
+            }
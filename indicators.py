@@ -0,0 +1,504 @@
+"""Technical indicators over OHLCV bars, computed once and then updated per bar.
+
+The first request for a (symbol, interval) computes SMA, EMA, RSI, MACD,
+Bollinger bands and VWAP over the whole history with vectorized NumPy and
+keeps the rolling state at the last bar. Each later bar updates every
+indicator in O(1) from that state; a revised last bar (an in-progress bar
+that moved) is replaced in O(1) too.
+
+EMAs (including the MACD lines and RSI's Wilder averages) are seeded with the
+first value, like ``pandas.Series.ewm(adjust=False)``. Values still inside an
+indicator's warm-up period are NaN (``null`` in JSON). Bollinger bands use the
+population standard deviation.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+DEFAULT_PARAMS = {
+    "sma": 20,
+    "ema": 20,
+    "rsi": 14,
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2.0),
+}
+OUTPUTS = (
+    "sma",
+    "ema",
+    "rsi",
+    "macd",
+    "macd_signal",
+    "macd_hist",
+    "bb_middle",
+    "bb_upper",
+    "bb_lower",
+    "vwap",
+)
+# VWAP restarts every session; intraday sessions are calendar days (UTC)
+DAY_NS = 86_400 * 10**9
+
+
+def frame_arrays(bars):
+    """``(ts, high, low, close, volume)`` arrays from an OHLCV frame; ts in UTC ns."""
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return (
+        index.as_unit("ns").asi8,
+        bars["High"].to_numpy(dtype=np.float64),
+        bars["Low"].to_numpy(dtype=np.float64),
+        bars["Close"].to_numpy(dtype=np.float64),
+        bars["Volume"].to_numpy(dtype=np.float64),
+    )
+
+
+# Vectorized indicators over a full history
+
+
+def sma(close, n):
+    out = np.full(len(close), np.nan)
+    if len(close) >= n:
+        csum = np.concatenate(([0.0], np.cumsum(close)))
+        out[n - 1 :] = (csum[n:] - csum[:-n]) / n
+    return out
+
+
+def ewm(values, alpha):
+    """Unmasked EMA seeded with the first value."""
+    if len(values) == 0:
+        return np.empty(0)
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
+
+
+def ema(close, n):
+    out = ewm(close, 2 / (n + 1))
+    out[: n - 1] = np.nan
+    return out
+
+
+def _wilder(close, n):
+    # Average gains and losses per bar (index 0 has none) for RSI
+    delta = np.diff(close)
+    avg_gain = np.concatenate(([np.nan], ewm(np.maximum(delta, 0.0), 1 / n)))
+    avg_loss = np.concatenate(([np.nan], ewm(np.maximum(-delta, 0.0), 1 / n)))
+    return avg_gain, avg_loss
+
+
+def _rsi_value(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 - 100 / (1 + avg_gain / avg_loss)
+    out = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), out)
+    return np.where(np.isnan(avg_gain), np.nan, out)
+
+
+def rsi(close, n=14):
+    out = _rsi_value(*_wilder(close, n))
+    out[:n] = np.nan
+    return out
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """``(macd, signal, histogram)``."""
+    line = ewm(close, 2 / (fast + 1)) - ewm(close, 2 / (slow + 1))
+    signal_line = ewm(line, 2 / (signal + 1))
+    line[: slow - 1] = np.nan
+    signal_line[: slow + signal - 2] = np.nan
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, n=20, k=2.0):
+    """``(middle, upper, lower)``."""
+    middle = sma(close, n)
+    std = np.full(len(close), np.nan)
+    if len(close) >= n:
+        std[n - 1 :] = np.lib.stride_tricks.sliding_window_view(close, n).std(axis=1)
+    return middle, middle + k * std, middle - k * std
+
+
+def vwap(ts, high, low, close, volume, session_ns=DAY_NS):
+    pv = (high + low + close) / 3 * volume
+    cum_pv = np.cumsum(pv)
+    cum_v = np.cumsum(volume)
+    if session_ns is not None and len(ts):
+        session = ts // session_ns
+        starts = np.flatnonzero(np.diff(session, prepend=session[0] - 1))
+        first = starts[np.searchsorted(starts, np.arange(len(ts)), side="right") - 1]
+        cum_pv = cum_pv - (cum_pv - pv)[first]
+        cum_v = cum_v - (cum_v - volume)[first]
+    out = np.full(len(close), np.nan)
+    np.divide(cum_pv, cum_v, out=out, where=cum_v > 0)
+    return out
+
+
+def compute(ts, high, low, close, volume, params=DEFAULT_PARAMS, session_ns=DAY_NS):
+    """Every indicator over the full history, as ``{name: array}``."""
+    fast, slow, signal = params["macd"]
+    n_bb, k = params["bollinger"]
+    line, signal_line, hist = macd(close, fast, slow, signal)
+    middle, upper, lower = bollinger(close, n_bb, k)
+    return {
+        "sma": sma(close, params["sma"]),
+        "ema": ema(close, params["ema"]),
+        "rsi": rsi(close, params["rsi"]),
+        "macd": line,
+        "macd_signal": signal_line,
+        "macd_hist": hist,
+        "bb_middle": middle,
+        "bb_upper": upper,
+        "bb_lower": lower,
+        "vwap": vwap(ts, high, low, close, volume, session_ns),
+    }
+
+
+# Rolling state for O(1) updates
+
+
+class _Window:
+    """The last ``n`` values with their running sum and sum of squares."""
+
+    __slots__ = ("n", "values", "pos", "count", "total", "total_sq")
+
+    def __init__(self, n, history=()):
+        self.n = n
+        self.values = [0.0] * n
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        for x in history[-n:]:
+            self.push(float(x))
+
+    def push(self, x):
+        if self.count == self.n:
+            old = self.values[self.pos]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.values[self.pos] = x
+        self.total += x
+        self.total_sq += x * x
+        self.pos = (self.pos + 1) % self.n
+        if self.pos == 0:
+            # Re-sum once per lap so rounding errors can't accumulate
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+
+    def replace_last(self, x):
+        i = (self.pos - 1) % self.n
+        old = self.values[i]
+        self.values[i] = x
+        self.total += x - old
+        self.total_sq += x * x - old * old
+
+    def mean(self):
+        return self.total / self.n if self.count == self.n else math.nan
+
+    def std(self):
+        if self.count < self.n:
+            return math.nan
+        mean = self.total / self.n
+        return math.sqrt(max(self.total_sq / self.n - mean * mean, 0.0))
+
+
+class _EMA:
+    __slots__ = ("alpha", "value", "prev", "count")
+
+    def __init__(self, alpha, value=math.nan, prev=math.nan, count=0):
+        self.alpha = alpha
+        self.value = value
+        self.prev = prev
+        self.count = count
+
+    def push(self, x):
+        self.prev = self.value
+        self.value = x if self.count == 0 else self.value + self.alpha * (x - self.value)
+        self.count += 1
+        return self.value
+
+    def replace_last(self, x):
+        self.value = x if self.count == 1 else self.prev + self.alpha * (x - self.prev)
+        return self.value
+
+
+class IndicatorState:
+    """Rolling state of every indicator as of the last bar."""
+
+    def __init__(self, params=DEFAULT_PARAMS, session_ns=DAY_NS):
+        self.params = params
+        self.session_ns = session_ns
+        fast, slow, signal = params["macd"]
+        self.sma = _Window(params["sma"])
+        self.bb = _Window(params["bollinger"][0])
+        self.ema = _EMA(2 / (params["ema"] + 1))
+        self.fast = _EMA(2 / (fast + 1))
+        self.slow = _EMA(2 / (slow + 1))
+        self.signal = _EMA(2 / (signal + 1))
+        self.gain = _EMA(1 / params["rsi"])
+        self.loss = _EMA(1 / params["rsi"])
+        self.count = 0
+        self.close = math.nan  # last close, and the one before it for revisions
+        self.prev_close = math.nan
+        self.session = None
+        self.cum_pv = 0.0
+        self.cum_v = 0.0
+        self.last_pv = 0.0
+        self.last_v = 0.0
+
+    @classmethod
+    def from_history(cls, ts, high, low, close, volume, params=DEFAULT_PARAMS, session_ns=DAY_NS):
+        """State at the last bar of ``close`` and friends."""
+        state = cls(params, session_ns)
+        n = len(close)
+        if n == 0:
+            return state
+        fast, slow, signal = params["macd"]
+        state.count = n
+        state.close = float(close[-1])
+        state.prev_close = float(close[-2]) if n > 1 else math.nan
+        state.sma = _Window(params["sma"], close)
+        state.bb = _Window(params["bollinger"][0], close)
+
+        def seeded(alpha, series):
+            prev = float(series[-2]) if len(series) > 1 else math.nan
+            return _EMA(alpha, float(series[-1]), prev, len(series))
+
+        fast_line = ewm(close, 2 / (fast + 1))
+        slow_line = ewm(close, 2 / (slow + 1))
+        state.ema = seeded(2 / (params["ema"] + 1), ewm(close, 2 / (params["ema"] + 1)))
+        state.fast = seeded(2 / (fast + 1), fast_line)
+        state.slow = seeded(2 / (slow + 1), slow_line)
+        state.signal = seeded(2 / (signal + 1), ewm(fast_line - slow_line, 2 / (signal + 1)))
+        if n > 1:
+            avg_gain, avg_loss = _wilder(close, params["rsi"])
+            state.gain = seeded(1 / params["rsi"], avg_gain[1:])
+            state.loss = seeded(1 / params["rsi"], avg_loss[1:])
+
+        pv = (high + low + close) / 3 * volume
+        state.last_pv = float(pv[-1])
+        state.last_v = float(volume[-1])
+        if session_ns is None:
+            first = 0
+        else:
+            state.session = int(ts[-1]) // session_ns
+            first = int(np.searchsorted(ts, state.session * session_ns, side="left"))
+        state.cum_pv = math.fsum(pv[first:])
+        state.cum_v = math.fsum(volume[first:])
+        return state
+
+    def _outputs(self):
+        params = self.params
+        fast, slow, signal = params["macd"]
+        n_bb, k = params["bollinger"]
+        count = self.count
+        deltas = count - 1
+        if deltas < params["rsi"]:
+            rsi_value = math.nan
+        elif self.loss.value == 0:
+            rsi_value = 100.0 if self.gain.value > 0 else 50.0
+        else:
+            rsi_value = 100 - 100 / (1 + self.gain.value / self.loss.value)
+        line = self.fast.value - self.slow.value
+        macd_value = line if count >= slow else math.nan
+        signal_value = self.signal.value if count >= slow + signal - 1 else math.nan
+        middle = self.bb.mean()
+        std = self.bb.std()
+        return (
+            self.sma.mean(),
+            self.ema.value if count >= params["ema"] else math.nan,
+            rsi_value,
+            macd_value,
+            signal_value,
+            macd_value - signal_value,
+            middle,
+            middle + k * std,
+            middle - k * std,
+            self.cum_pv / self.cum_v if self.cum_v > 0 else math.nan,
+        )
+
+    def push(self, ts, high, low, close, volume):
+        """Add a new bar; returns the indicator values at that bar."""
+        self.sma.push(close)
+        self.bb.push(close)
+        self.ema.push(close)
+        self.fast.push(close)
+        self.slow.push(close)
+        self.signal.push(self.fast.value - self.slow.value)
+        if self.count > 0:
+            delta = close - self.close
+            self.gain.push(max(delta, 0.0))
+            self.loss.push(max(-delta, 0.0))
+        self.prev_close = self.close
+        self.close = close
+        self.count += 1
+
+        pv = (high + low + close) / 3 * volume
+        session = None if self.session_ns is None else ts // self.session_ns
+        if session != self.session:
+            self.session = session
+            self.cum_pv = 0.0
+            self.cum_v = 0.0
+        self.cum_pv += pv
+        self.cum_v += volume
+        self.last_pv = pv
+        self.last_v = volume
+        return self._outputs()
+
+    def replace_last(self, high, low, close, volume):
+        """Revise the last bar (same timestamp, new values)."""
+        self.sma.replace_last(close)
+        self.bb.replace_last(close)
+        self.ema.replace_last(close)
+        self.fast.replace_last(close)
+        self.slow.replace_last(close)
+        self.signal.replace_last(self.fast.value - self.slow.value)
+        if self.count > 1:
+            delta = close - self.prev_close
+            self.gain.replace_last(max(delta, 0.0))
+            self.loss.replace_last(max(-delta, 0.0))
+        self.close = close
+
+        pv = (high + low + close) / 3 * volume
+        self.cum_pv += pv - self.last_pv
+        self.cum_v += volume - self.last_v
+        self.last_pv = pv
+        self.last_v = volume
+        return self._outputs()
+
+
+class IndicatorSeries:
+    """Indicator values for one (symbol, interval), newest ``max_points`` kept."""
+
+    def __init__(self, params=DEFAULT_PARAMS, session_ns=DAY_NS, max_points=10_000):
+        self.params = params
+        self.session_ns = session_ns
+        self.max_points = max_points
+        self.lock = threading.Lock()
+        self.state = None
+        self.last_bar = None  # (ts, high, low, close, volume)
+        self._ts = np.empty(0, dtype=np.int64)
+        self._values = np.empty((0, len(OUTPUTS)))
+        self._size = 0
+
+    def _reserve(self, extra):
+        size = self._size + extra
+        if size > len(self._ts):
+            keep = min(self._size, self.max_points)
+            capacity = max(2 * (keep + extra), 64)
+            ts = np.empty(capacity, dtype=np.int64)
+            values = np.empty((capacity, len(OUTPUTS)))
+            ts[:keep] = self._ts[self._size - keep : self._size]
+            values[:keep] = self._values[self._size - keep : self._size]
+            self._ts, self._values, self._size = ts, values, keep
+
+    def load(self, ts, high, low, close, volume):
+        """Compute everything over a full history (vectorized)."""
+        outputs = compute(ts, high, low, close, volume, self.params, self.session_ns)
+        self.state = IndicatorState.from_history(ts, high, low, close, volume, self.params, self.session_ns)
+        keep = min(len(ts), self.max_points)
+        self._size = 0
+        self._ts = np.empty(0, dtype=np.int64)
+        self._reserve(keep)
+        self._ts[:keep] = ts[len(ts) - keep :]
+        for j, name in enumerate(OUTPUTS):
+            self._values[:keep, j] = outputs[name][len(ts) - keep :]
+        self._size = keep
+        if len(ts):
+            self.last_bar = (int(ts[-1]), float(high[-1]), float(low[-1]), float(close[-1]), float(volume[-1]))
+
+    def push(self, ts, high, low, close, volume):
+        self._reserve(1)
+        self._ts[self._size] = ts
+        self._values[self._size] = self.state.push(ts, high, low, close, volume)
+        self._size += 1
+        self.last_bar = (ts, high, low, close, volume)
+
+    def replace_last(self, high, low, close, volume):
+        self._values[self._size - 1] = self.state.replace_last(high, low, close, volume)
+        self.last_bar = (self.last_bar[0], high, low, close, volume)
+
+    @property
+    def last_timestamp(self):
+        return None if self.last_bar is None else self.last_bar[0]
+
+    def since(self, start_ns=None):
+        """``{"t": [...], name: [...]}`` from ``start_ns`` on, NaN as None."""
+        lo = 0 if start_ns is None else int(np.searchsorted(self._ts[: self._size], start_ns, side="left"))
+        ts = self._ts[lo : self._size]
+        values = self._values[lo : self._size]
+        payload = {"t": np.datetime_as_string(ts.astype("datetime64[ns]"), unit="s").tolist()}
+        for j, name in enumerate(OUTPUTS):
+            column = values[:, j]
+            payload[name] = [None if math.isnan(v) else round(v, 6) for v in column.tolist()]
+        return payload
+
+
+class IndicatorEngine:
+    """Indicator series per (symbol, interval), LRU-bounded to ``max_series``."""
+
+    def __init__(self, params=None, max_series=128, max_points=10_000):
+        self.params = params or DEFAULT_PARAMS
+        self.max_series = max_series
+        self.max_points = max_points
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self.full_loads = 0
+        self.bars_pushed = 0
+        self.bars_revised = 0
+
+    def last_timestamp(self, key):
+        with self._lock:
+            series = self._series.get(key)
+        return None if series is None else series.last_timestamp
+
+    def update(self, key, ts, high, low, close, volume, session_ns=DAY_NS):
+        """Bring ``key`` up to date with these bars and return its series.
+
+        ``ts`` must be ascending. Bars up to the last one seen are skipped,
+        except that a changed last bar is revised in place.
+        """
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = IndicatorSeries(self.params, session_ns, self.max_points)
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+
+        with series.lock:
+            if series.state is None:
+                series.load(ts, high, low, close, volume)
+                with self._lock:
+                    self.full_loads += 1
+                return series
+            last = series.last_timestamp
+            i = int(np.searchsorted(ts, last, side="left")) if last is not None else 0
+            revised = pushed = 0
+            if i < len(ts) and ts[i] == last:
+                bar = (float(high[i]), float(low[i]), float(close[i]), float(volume[i]))
+                if bar != series.last_bar[1:]:
+                    series.replace_last(*bar)
+                    revised = 1
+                i += 1
+            for j in range(i, len(ts)):
+                series.push(int(ts[j]), float(high[j]), float(low[j]), float(close[j]), float(volume[j]))
+                pushed += 1
+        with self._lock:
+            self.bars_pushed += pushed
+            self.bars_revised += revised
+        return series
+
+    def stats(self):
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "max_series": self.max_series,
+                "full_loads": self.full_loads,
+                "bars_pushed": self.bars_pushed,
+                "bars_revised": self.bars_revised,
+            }
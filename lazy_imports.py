@@ -0,0 +1,37 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    ``pd = lazy_import("pandas")`` keeps pandas out of import time for
+    modules that only use it inside functions. After the first access the
+    real module's namespace is copied in, so later lookups are plain
+    attribute hits. ``importlib.import_module`` takes the import lock, so
+    concurrent first accesses are safe.
+    """
+
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+
+    def _load(self):
+        module = importlib.import_module(self._lazy_name)
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._lazy_name}'>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def load(*modules):
+    """Import lazy modules now, e.g. in a pre-fork warm-up."""
+    for module in modules:
+        if isinstance(module, LazyModule):
+            module._load()
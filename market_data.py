@@ -0,0 +1,312 @@
+import datetime
+import os
+import threading
+import time
+import zlib
+
+from lazy_imports import lazy_import
+
+# Only used inside functions; loaded on first use to keep web startup fast
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Minutes per bar for the intervals we use
+INTERVAL_MINUTES = {
+    "1m": 1,
+    "5m": 5,
+    "15m": 15,
+    "30m": 30,
+    "1h": 60,
+    "1d": 1440,
+}
+
+
+def utcnow():
+    """The current time as a naive UTC datetime.
+
+    Bar timestamps are naive UTC throughout (providers, the OHLCV store and
+    the snapshot), so "now" has to be too, whatever the host's time zone.
+    """
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def to_utc(ts):
+    """``ts`` as a naive UTC ``pd.Timestamp``; naive input is taken as UTC."""
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert(None) if ts.tz is not None else ts
+
+
+class MarketDataProvider:
+    """Source of OHLCV bars for many symbols at once.
+
+    ``fetch_ohlcv`` takes naive UTC ``start``/``end`` and returns
+    ``{symbol: DataFrame}`` with ``OHLCV_COLUMNS`` indexed by bar start time
+    in naive UTC; symbols with no data are left out.
+    """
+
+    name = "base"
+
+    def fetch_ohlcv(self, symbols, start, end, interval="1d"):
+        raise NotImplementedError
+
+    def fetch_quotes(self, symbols):
+        now = utcnow()
+        bars = self.fetch_ohlcv(symbols, now - datetime.timedelta(days=5), now, "5m")
+        return {symbol: float(data["Close"].iloc[-1]) for symbol, data in bars.items()}
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def fetch_ohlcv(self, symbols, start, end, interval="1d"):
+        import yfinance as yf
+
+        symbols = list(symbols)
+        # yfinance reads naive times in the exchange's time zone
+        frame = yf.download(
+            symbols,
+            start=to_utc(start).tz_localize("UTC"),
+            end=to_utc(end).tz_localize("UTC"),
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+        )
+        result = {}
+        for symbol in symbols:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if symbol not in frame.columns.get_level_values(0):
+                    continue
+                data = frame[symbol]
+            else:
+                data = frame
+            data = data[OHLCV_COLUMNS].dropna(how="all")
+            if not data.empty:
+                if data.index.tz is not None:
+                    data = data.set_axis(data.index.tz_convert(None))
+                result[symbol] = data
+        return result
+
+
+class FakeProvider(MarketDataProvider):
+    """Deterministic offline market data for load tests and CI.
+
+    Each symbol follows a seeded daily random walk starting at ``ORIGIN``.
+    Intraday bars are a seeded Brownian bridge between consecutive daily
+    closes, so any window of any interval is reproducible and overlapping
+    requests agree with each other.
+    """
+
+    name = "fake"
+    ORIGIN = datetime.datetime(2010, 1, 1)
+
+    def __init__(self, seed=0, volatility=0.02):
+        self.seed = seed
+        self.volatility = volatility
+        self._daily = {}
+        self._lock = threading.Lock()
+
+    def _key(self, symbol):
+        return zlib.crc32(symbol.encode())
+
+    def _daily_closes(self, symbol, days):
+        with self._lock:
+            closes = self._daily.get(symbol)
+            if closes is None or len(closes) < days:
+                # Same seed, longer draw: the existing prefix is unchanged
+                key = self._key(symbol)
+                rng = np.random.default_rng([self.seed, key])
+                returns = rng.normal(0.0003, self.volatility, size=days + 365)
+                base = 20 + key % 480
+                closes = base * np.exp(np.cumsum(returns))
+                self._daily[symbol] = closes
+            return closes
+
+    def _daily_bars(self, symbol, start, end):
+        first = max((start - self.ORIGIN).days, 1)
+        last = (end - self.ORIGIN).days
+        if last < first:
+            return None
+        closes = self._daily_closes(symbol, last + 1)
+        days = np.arange(first, last + 1)
+        rng = np.random.default_rng([self.seed, self._key(symbol), 1])
+        wicks = np.abs(rng.normal(0, self.volatility / 2, size=(2, len(closes))))[:, days]
+        volumes = rng.integers(1_000_000, 50_000_000, size=len(closes))[days]
+        close = closes[days]
+        open_ = closes[days - 1]
+        index = pd.DatetimeIndex([self.ORIGIN + datetime.timedelta(days=int(d)) for d in days], name="Date")
+        data = pd.DataFrame(
+            {
+                "Open": open_,
+                "High": np.maximum(open_, close) * (1 + wicks[0]),
+                "Low": np.minimum(open_, close) * (1 - wicks[1]),
+                "Close": close,
+                "Volume": volumes,
+            },
+            index=index,
+        )
+        return data[data.index >= start]
+
+    def _intraday_bars(self, symbol, start, end, minutes):
+        first_day = max((start - self.ORIGIN).days, 1)
+        last_day = (end - self.ORIGIN).days
+        if last_day < first_day:
+            return None
+        closes = self._daily_closes(symbol, last_day + 1)
+        per_day = 1440 // minutes
+        key = self._key(symbol)
+        frames = []
+        for day in range(first_day, last_day + 1):
+            rng = np.random.default_rng([self.seed, key, day, minutes])
+            steps = rng.normal(0, self.volatility / np.sqrt(per_day), size=per_day)
+            walk = np.cumsum(steps)
+            t = np.arange(1, per_day + 1) / per_day
+            # Pin the walk to the previous and current daily close
+            log_path = (
+                np.log(closes[day - 1])
+                + t * (np.log(closes[day]) - np.log(closes[day - 1]))
+                + walk - t * walk[-1]
+            )
+            close = np.exp(log_path)
+            open_ = np.concatenate(([closes[day - 1]], close[:-1]))
+            wick = np.abs(rng.normal(0, self.volatility / (2 * np.sqrt(per_day)), size=(2, per_day)))
+            day_start = self.ORIGIN + datetime.timedelta(days=day)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "Open": open_,
+                        "High": np.maximum(open_, close) * (1 + wick[0]),
+                        "Low": np.minimum(open_, close) * (1 - wick[1]),
+                        "Close": close,
+                        "Volume": rng.integers(1_000, 500_000, size=per_day),
+                    },
+                    index=pd.date_range(day_start, periods=per_day, freq=f"{minutes}min", name="Datetime"),
+                )
+            )
+        data = pd.concat(frames)
+        return data[(data.index >= start) & (data.index < end)]
+
+    def fetch_ohlcv(self, symbols, start, end, interval="1d"):
+        start = pd.Timestamp(start).to_pydatetime()
+        end = min(pd.Timestamp(end).to_pydatetime(), utcnow())
+        minutes = INTERVAL_MINUTES[interval]
+        result = {}
+        for symbol in symbols:
+            if minutes == 1440:
+                data = self._daily_bars(symbol, start, end)
+            else:
+                data = self._intraday_bars(symbol, start, end, minutes)
+            if data is not None and not data.empty:
+                result[symbol] = data
+        return result
+
+
+PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "fake": FakeProvider,
+}
+
+
+def get_provider(name=None, **kwargs):
+    """Build the provider named by ``name`` or ``$MARKET_DATA_PROVIDER``."""
+    name = name or os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+    if name == "fake" and "seed" not in kwargs:
+        kwargs["seed"] = int(os.environ.get("MARKET_DATA_SEED", 0))
+    try:
+        return PROVIDERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown market data provider '{name}'") from None
+
+
+class MarketDataService:
+    """In-memory snapshot of quotes and chart bars for a symbol universe.
+
+    A daemon thread refreshes everything every ``refresh_interval`` seconds
+    with one batched provider call per window; readers only touch the
+    snapshot and never wait on the network. With an ``OHLCVStore`` the
+    refresh only fetches bars newer than the stored ones.
+    """
+
+    def __init__(self, provider, symbols, windows, refresh_interval=60, store=None):
+        self.provider = provider
+        self.store = store
+        self.symbols = list(symbols)
+        # {window: (timedelta lookback, interval)}
+        self.windows = windows
+        self.refresh_interval = refresh_interval
+        self.quotes = {}
+        self.bars = {}
+        self.refreshed_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def refresh(self):
+        now = utcnow()
+        bars = {}
+        for window, (lookback, interval) in self.windows.items():
+            if self.store is not None:
+                self.store.update(self.provider, self.symbols, interval, now - lookback, now)
+                for symbol in self.symbols:
+                    bars[(symbol, window)] = self.store.read_frame(symbol, interval, start=now - lookback)
+                continue
+            for symbol, data in self.provider.fetch_ohlcv(self.symbols, now - lookback, now, interval).items():
+                bars[(symbol, window)] = data
+        quotes = self.provider.fetch_quotes(self.symbols)
+        with self._lock:
+            self.bars.update(bars)
+            self.quotes.update(quotes)
+            self.refreshed_at = time.time()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = repr(e)
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        # Every request thread calls this; only one may start the thread
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="market-data", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_stale(self):
+        return self.refreshed_at is None or time.time() - self.refreshed_at > 3 * self.refresh_interval
+
+    def get_quote(self, symbol):
+        """Return ``(price, stale)`` or ``None`` if the symbol isn't in the snapshot."""
+        with self._lock:
+            price = self.quotes.get(symbol)
+        if price is None:
+            return None
+        return price, self.is_stale()
+
+    def get_bars(self, symbol, window):
+        with self._lock:
+            data = self.bars.get((symbol, window))
+        if data is None:
+            return None
+        return data, self.is_stale()
+
+    def status(self):
+        return {
+            "provider": self.provider.name,
+            "symbols": len(self.symbols),
+            "refresh_interval": self.refresh_interval,
+            "refreshed_at": self.refreshed_at,
+            "age": None if self.refreshed_at is None else time.time() - self.refreshed_at,
+            "stale": self.is_stale(),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _records(frame, top_n):
+    frame = frame.head(top_n)
+    # NaN isn't valid JSON; expose missing cells as None
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+class MarketTrends:
+    """Top gainers/losers snapshot refreshed in the background.
+
+    Both tables are scraped concurrently every ``refresh_interval`` seconds;
+    the routes only read the precomputed top-N lists.
+    """
+
+    def __init__(self, fetch_gainers, fetch_losers, refresh_interval=300, top_n=5):
+        self.fetch_gainers = fetch_gainers
+        self.fetch_losers = fetch_losers
+        self.refresh_interval = refresh_interval
+        self.top_n = top_n
+        # (gainers, losers, refreshed_at), replaced as a whole on refresh so
+        # readers never see a mixed snapshot
+        self._state = ([], [], None)
+        self.last_error = None
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="market-trends")
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def refresh(self):
+        gainers = self._executor.submit(self.fetch_gainers)
+        losers = self._executor.submit(self.fetch_losers)
+        top_gainers = _records(gainers.result(), self.top_n)
+        top_losers = _records(losers.result(), self.top_n)
+        self._state = (top_gainers, top_losers, time.time())
+
+    def snapshot(self):
+        gainers, losers, refreshed_at = self._state
+        return {
+            "gainers": gainers,
+            "losers": losers,
+            "refreshed_at": refreshed_at,
+            "age": None if refreshed_at is None else time.time() - refreshed_at,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = repr(e)
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        # Every request thread calls this; only one may start the thread
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="market-trends", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        snapshot = self.snapshot()
+        return {
+            "gainers": len(snapshot["gainers"]),
+            "losers": len(snapshot["losers"]),
+            "refreshed_at": snapshot["refreshed_at"],
+            "age": snapshot["age"],
+            "last_error": self.last_error,
+        }
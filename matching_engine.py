@@ -0,0 +1,330 @@
+import heapq
+import itertools
+import threading
+from collections import defaultdict, namedtuple
+
+BUY = "BUY"
+SELL = "SELL"
+LIMIT = "LIMIT"
+MARKET = "MARKET"
+GTC = "GTC"
+IOC = "IOC"
+
+# Orders in these states are no longer in the book (heaps drop them lazily)
+DONE = ("FILLED", "CANCELLED")
+
+Fill = namedtuple("Fill", "symbol buy_order_id sell_order_id buyer_id seller_id price quantity")
+
+
+class OrderRejected(Exception):
+    pass
+
+
+class Order:
+    __slots__ = ("id", "user_id", "symbol", "side", "kind", "tif", "price", "quantity", "remaining", "seq", "status")
+
+    def __init__(self, id, user_id, symbol, side, kind, tif, price, quantity, seq):
+        self.id = id
+        self.user_id = user_id
+        self.symbol = symbol
+        self.side = side
+        self.kind = kind
+        self.tif = tif
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity
+        self.seq = seq
+        self.status = "NEW"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "symbol": self.symbol,
+            "side": self.side,
+            "type": self.kind,
+            "tif": self.tif,
+            "price": self.price,
+            "quantity": self.quantity,
+            "filled": self.quantity - self.remaining,
+            "remaining": self.remaining,
+            "status": self.status,
+        }
+
+
+class OrderBook:
+    """Price-time priority book for one symbol.
+
+    Bids and asks are binary heaps keyed by (price, arrival sequence);
+    cancelled orders are dropped lazily when they reach the top.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self._bids = []  # (-price, seq, order)
+        self._asks = []  # (price, seq, order)
+        self.orders = {}
+
+    def _top(self, heap):
+        while heap and heap[0][2].status in DONE:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def best_bid(self):
+        return self._top(self._bids)
+
+    def best_ask(self):
+        return self._top(self._asks)
+
+    def match(self, order, undo=None):
+        """Match ``order`` against the opposite side and return the fills.
+
+        Fills trade at the resting (maker) order's price; ``order`` is never
+        added to the book here. If ``undo`` is a list, each maker touched is
+        appended to it with the quantity taken, for ``unmatch``.
+        """
+        fills = []
+        if order.side == BUY:
+            heap = self._asks
+            crosses = lambda maker: order.price is None or maker.price <= order.price  # noqa: E731
+        else:
+            heap = self._bids
+            crosses = lambda maker: order.price is None or maker.price >= order.price  # noqa: E731
+
+        while order.remaining:
+            maker = self._top(heap)
+            if maker is None or not crosses(maker):
+                break
+            quantity = min(order.remaining, maker.remaining)
+            order.remaining -= quantity
+            maker.remaining -= quantity
+            if maker.remaining == 0:
+                maker.status = "FILLED"
+                heapq.heappop(heap)
+                del self.orders[maker.id]
+            else:
+                maker.status = "PARTIAL"
+            if undo is not None:
+                undo.append((maker, quantity))
+            buy, sell = (order, maker) if order.side == BUY else (maker, order)
+            fills.append(Fill(self.symbol, buy.id, sell.id, buy.user_id, sell.user_id, maker.price, quantity))
+        return fills
+
+    def unmatch(self, order, undo):
+        """Reverse a ``match``: makers get their quantity back, and filled
+        makers return to the book in their original queue position."""
+        for maker, quantity in reversed(undo):
+            order.remaining += quantity
+            if maker.remaining == 0:
+                self._push(maker)
+            maker.remaining += quantity
+            maker.status = "PARTIAL" if maker.remaining < maker.quantity else "OPEN"
+
+    def rest(self, order):
+        order.status = "PARTIAL" if order.remaining < order.quantity else "OPEN"
+        self._push(order)
+
+    def _push(self, order):
+        self.orders[order.id] = order
+        if order.side == BUY:
+            heapq.heappush(self._bids, (-order.price, order.seq, order))
+        else:
+            heapq.heappush(self._asks, (order.price, order.seq, order))
+
+    def cancel(self, order_id):
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            order.status = "CANCELLED"
+        return order
+
+    def quote_cost(self, quantity):
+        """Cost of buying ``quantity`` from the asks right now (less if the book is thin)."""
+        cost = 0.0
+        for price, _, order in sorted(self._asks):
+            if order.status in DONE:
+                continue
+            take = min(quantity, order.remaining)
+            cost += take * price
+            quantity -= take
+            if quantity == 0:
+                break
+        return cost
+
+    def depth(self, levels=10):
+        def aggregate(heap, sign):
+            book = defaultdict(int)
+            for key, _, order in heap:
+                if order.status not in DONE:
+                    book[key * sign] += order.remaining
+            return [{"price": price, "quantity": book[price]} for price in sorted(book, reverse=sign < 0)[:levels]]
+
+        return {"symbol": self.symbol, "bids": aggregate(self._bids, -1), "asks": aggregate(self._asks, 1)}
+
+
+class MatchingEngine:
+    """Order books for many symbols with pre-trade checks and settlement.
+
+    ``balances(user_id, symbol)`` returns the user's ``(funds, shares)`` and
+    ``settle(fills)`` persists fills; both are optional so the engine can run
+    on its own in benchmarks. Cash for open buy orders and shares for open
+    sell orders are reserved in memory, so a user can't commit the same
+    funds or shares to several resting orders.
+
+    Fills are settled before the book's changes are kept. If ``settle``
+    raises, the book is restored; makers that can no longer cover their fill
+    (their cash or shares were spent elsewhere, or the user was deleted) are
+    cancelled and matching goes on against the next level. If every maker is
+    covered, the taker is rejected and the exception propagates.
+    """
+
+    def __init__(self, balances=None, settle=None):
+        self.balances = balances
+        self.settle = settle
+        self.books = {}
+        self._locks = defaultdict(threading.Lock)  # per symbol
+        # Reservations span symbols, so they're guarded per user
+        self._user_locks = defaultdict(threading.Lock)
+        self._reserved_cash = defaultdict(float)
+        self._reserved_shares = defaultdict(int)
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._symbols = {}
+
+    def book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books.setdefault(symbol, OrderBook(symbol))
+        return book
+
+    def depth(self, symbol, levels=10):
+        """Aggregated levels of ``symbol``'s book; read-only, so an unknown
+        symbol gets an empty book rather than a new one."""
+        book = self.books.get(symbol)
+        if book is None:
+            return {"symbol": symbol, "bids": [], "asks": []}
+        return book.depth(levels)
+
+    def _reserve(self, book, order):
+        with self._user_locks[order.user_id]:
+            funds, shares = self.balances(order.user_id, order.symbol)
+            if order.side == BUY:
+                need = order.price * order.quantity if order.price is not None else book.quote_cost(order.quantity)
+                if funds - self._reserved_cash[order.user_id] < need:
+                    raise OrderRejected("Insufficient funds.")
+                self._reserved_cash[order.user_id] += need
+                return need
+            key = (order.user_id, order.symbol)
+            if shares - self._reserved_shares[key] < order.quantity:
+                raise OrderRejected("Insufficient stock quantity.")
+            self._reserved_shares[key] += order.quantity
+            return order.quantity
+
+    def _release(self, user_id, symbol, side, amount):
+        with self._user_locks[user_id]:
+            if side == BUY:
+                self._reserved_cash[user_id] -= amount
+            else:
+                self._reserved_shares[(user_id, symbol)] -= amount
+
+    def submit(self, user_id, symbol, side, quantity, price=None, kind=LIMIT, tif=GTC):
+        """Submit an order; returns ``(order, fills)``. Raises OrderRejected.
+
+        Market and IOC orders never rest: whatever doesn't fill immediately
+        is cancelled.
+        """
+        side, kind, tif = side.upper(), kind.upper(), tif.upper()
+        if side not in (BUY, SELL):
+            raise OrderRejected("Side must be BUY or SELL.")
+        if kind not in (LIMIT, MARKET):
+            raise OrderRejected("Type must be LIMIT or MARKET.")
+        if tif not in (GTC, IOC):
+            raise OrderRejected("Time in force must be GTC or IOC.")
+        if quantity <= 0:
+            raise OrderRejected("Quantity must be positive.")
+        if kind == LIMIT and (price is None or not price > 0):
+            raise OrderRejected("Limit orders need a positive price.")
+        if kind == MARKET:
+            price = None
+
+        book = self.book(symbol)
+        with self._locks[symbol]:
+            order = Order(next(self._ids), user_id, symbol, side, kind, tif, price, quantity, next(self._seq))
+            reserved = self._reserve(book, order) if self.balances is not None else 0
+            while True:
+                undo = []
+                fills = book.match(order, undo)
+                if not fills or self.settle is None:
+                    break
+                try:
+                    self.settle(fills)
+                    break
+                except Exception:
+                    book.unmatch(order, undo)
+                    unfunded = self._unfunded_makers(symbol, undo) if self.balances is not None else []
+                    if not unfunded:
+                        if self.balances is not None:
+                            self._release(user_id, symbol, side, reserved)
+                        raise
+                    # Otherwise the level would stay on top and fail every
+                    # crossing order
+                    for maker in unfunded:
+                        self._cancel(book, maker)
+            for fill in fills:
+                maker_id = fill.sell_order_id if side == BUY else fill.buy_order_id
+                if maker_id not in book.orders:
+                    self._symbols.pop(maker_id, None)
+
+            if order.remaining and kind == LIMIT and tif == GTC:
+                book.rest(order)
+                self._symbols[order.id] = symbol
+                keep = order.price * order.remaining if side == BUY else order.remaining
+            else:
+                order.status = "FILLED" if not order.remaining else "CANCELLED"
+                keep = 0
+
+            if self.balances is not None:
+                # Settled fills move real funds/shares, so the taker keeps only
+                # the resting part reserved and each maker releases its share
+                self._release(user_id, symbol, side, reserved - keep)
+                for fill in fills:
+                    if side == BUY:
+                        self._release(fill.seller_id, symbol, SELL, fill.quantity)
+                    else:
+                        self._release(fill.buyer_id, symbol, BUY, fill.price * fill.quantity)
+        return order, fills
+
+    def _unfunded_makers(self, symbol, undo):
+        unfunded = []
+        for maker, quantity in undo:
+            funds, shares = self.balances(maker.user_id, symbol)
+            if (funds < maker.price * quantity) if maker.side == BUY else (shares < quantity):
+                unfunded.append(maker)
+        return unfunded
+
+    def _cancel(self, book, order):
+        # Caller holds the symbol's lock
+        book.cancel(order.id)
+        self._symbols.pop(order.id, None)
+        if self.balances is not None:
+            amount = order.price * order.remaining if order.side == BUY else order.remaining
+            self._release(order.user_id, order.symbol, order.side, amount)
+
+    def cancel(self, order_id, user_id=None):
+        """Cancel a resting order (only the owner's if ``user_id`` is given)."""
+        symbol = self._symbols.get(order_id)
+        if symbol is None:
+            return None
+        book = self.book(symbol)
+        with self._locks[symbol]:
+            order = book.orders.get(order_id)
+            if order is None or (user_id is not None and order.user_id != user_id):
+                return None
+            self._cancel(book, order)
+            return order
+
+    def cancel_user(self, user_id):
+        """Cancel every resting order of ``user_id`` (e.g. when it's deleted)."""
+        return [
+            order
+            for order in (self.cancel(order_id, user_id=user_id) for order_id in list(self._symbols))
+            if order is not None
+        ]
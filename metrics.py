@@ -0,0 +1,258 @@
+import contextlib
+import functools
+import heapq
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as _Tally, defaultdict
+
+# Seconds; covers fast cache hits through slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value not in (float("inf"), float("-inf")) else ("+Inf" if value > 0 else "-Inf")
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    @contextlib.contextmanager
+    def timer(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def time(self, **labels):
+        """Decorator timing every call of the wrapped function."""
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(**labels):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = (("le", "+Inf" if bound == float("inf") else repr(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class GaugeFunc:
+    """Gauge read at scrape time; ``fn()`` returns ``{label values: value}``."""
+
+    def __init__(self, name, help, fn, labels=()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.fn().items()):
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, labels=()):
+        return self.register(GaugeFunc(name, help, fn, labels))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that keeps the stacks of the slowest requests.
+
+    While requests run, a background thread samples their threads' stacks
+    every ``interval`` seconds. Requests slower than ``threshold`` seconds
+    keep their most frequent stacks; the ``keep`` slowest are retained.
+    """
+
+    def __init__(self, threshold=1.0, interval=0.01, keep=20, top_stacks=5):
+        self.threshold = threshold
+        self.interval = interval
+        self.keep = keep
+        self.top_stacks = top_stacks
+        self._active = {}  # thread id -> stack tally
+        self._slowest = []  # min-heap of (duration, seq, report)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        # Every request thread calls this; only one may start the thread
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            stacks = {
+                thread_id: "".join(traceback.format_stack(frames[thread_id]))
+                for thread_id in active
+                if thread_id in frames
+            }
+            with self._lock:
+                for thread_id, stack in stacks.items():
+                    if self._active.get(thread_id) is active[thread_id]:
+                        active[thread_id][stack] += 1
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = _Tally()
+
+    def end(self, duration, **info):
+        with self._lock:
+            tally = self._active.pop(threading.get_ident(), None)
+            if tally is None or duration < self.threshold:
+                return
+            report = dict(
+                info,
+                duration=duration,
+                samples=sum(tally.values()),
+                stacks=[{"samples": count, "stack": stack} for stack, count in tally.most_common(self.top_stacks)],
+            )
+            self._seq += 1
+            entry = (duration, self._seq, report)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    def slowest(self):
+        with self._lock:
+            return [report for _, _, report in sorted(self._slowest, reverse=True)]
+
+
+_request_sql = threading.local()
+
+
+def instrument_sqlalchemy(engine, queries, query_seconds):
+    """Count and time every statement, per request where one is active."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        queries.inc(operation=operation)
+        query_seconds.observe(elapsed, operation=operation)
+        stats = getattr(_request_sql, "stats", None)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # after_cursor_execute doesn't run for a failed statement, so drop its
+        # start time or the next statement on this connection pops it
+        conn = context.connection
+        if conn is not None and context.execution_context is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def begin_request_sql():
+    _request_sql.stats = [0, 0.0]
+
+
+def end_request_sql():
+    stats = getattr(_request_sql, "stats", None)
+    _request_sql.stats = None
+    return stats or [0, 0.0]
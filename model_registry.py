@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+# Prophet (and cmdstanpy behind it) loads only once a model is read or fitted
+prophet = lazy_import("prophet")
+serialize = lazy_import("prophet.serialize")
+
+DEFAULT_ROOT = os.environ.get(
+    "MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "models")
+)
+
+# Hyperparameters used by the forecasting app
+PROPHET_PARAMS = {"interval_width": 0.95}
+
+
+def data_hash(df):
+    """Stable hash of a Prophet training frame (``ds``/``y`` columns)."""
+    digest = hashlib.sha256()
+    digest.update(df["ds"].to_numpy(dtype="datetime64[ns]").tobytes())
+    digest.update(df["y"].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def params_hash(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def warm_start_params(m):
+    # Fitted parameters in the shape Prophet.fit(init=...) expects, see
+    # https://facebook.github.io/prophet/docs/additional_topics.html
+    res = {}
+    for pname in ["k", "m", "sigma_obs"]:
+        if m.mcmc_samples == 0:
+            res[pname] = m.params[pname][0][0]
+        else:
+            res[pname] = np.mean(m.params[pname])
+    for pname in ["delta", "beta"]:
+        if m.mcmc_samples == 0:
+            res[pname] = m.params[pname][0]
+        else:
+            res[pname] = np.mean(m.params[pname], axis=0)
+    return res
+
+
+class ModelRegistry:
+    """Fitted Prophet models on disk, keyed by (symbol, data hash, params).
+
+    ``get_or_fit`` returns the stored model when the training data and
+    hyperparameters are unchanged. When only the data changed (new bars),
+    the refit is warm-started from the latest model for the same symbol and
+    hyperparameters.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.fits = 0
+        self.warm_fits = 0
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def _model_path(self, symbol, key):
+        return os.path.join(self._symbol_dir(symbol), f"{key}.json")
+
+    def _latest_path(self, symbol, phash):
+        return os.path.join(self._symbol_dir(symbol), f"latest-{phash}")
+
+    def model_key(self, symbol, df, params):
+        return f"{data_hash(df)}-{params_hash(params)}"
+
+    def load(self, symbol, key):
+        try:
+            with open(self._model_path(symbol, key)) as f:
+                return serialize.model_from_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def latest(self, symbol, params):
+        try:
+            with open(self._latest_path(symbol, params_hash(params))) as f:
+                return self.load(symbol, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def save(self, symbol, key, params, m):
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        for path, content in (
+            (self._model_path(symbol, key), serialize.model_to_json(m)),
+            (self._latest_path(symbol, params_hash(params)), key),
+        ):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    def get_or_fit(self, symbol, df, params=PROPHET_PARAMS):
+        """Return ``(model, key)`` for training frame ``df``."""
+        key = self.model_key(symbol, df, params)
+        with self._lock:
+            m = self.load(symbol, key)
+            if m is not None:
+                self.loads += 1
+                return m, key
+
+            m = None
+            previous = self.latest(symbol, params)
+            if previous is not None:
+                try:
+                    m = prophet.Prophet(**params).fit(df, init=warm_start_params(previous))
+                    self.warm_fits += 1
+                except Exception:
+                    # e.g. a different number of changepoints; fit from scratch
+                    m = None
+            if m is None:
+                m = prophet.Prophet(**params).fit(df)
+                self.fits += 1
+            self.save(symbol, key, params, m)
+            return m, key
@@ -0,0 +1,111 @@
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+
+from lazy_imports import lazy_import
+
+requests = lazy_import("requests")
+
+ITEM_FIELDS = ("title", "link", "description", "guid", "pubDate")
+
+
+def iter_items(stream):
+    """Yield RSS ``<item>`` elements from ``stream`` as dicts while it is read."""
+    for _, elem in ET.iterparse(stream, events=("end",)):
+        if elem.tag != "item":
+            continue
+        item = {field: (elem.findtext(field) or "").strip() for field in ITEM_FIELDS}
+        item["guid"] = item["guid"] or item["link"] or item["title"]
+        elem.clear()
+        yield item
+
+
+class NewsFeed:
+    """RSS feed refreshed in the background into a bounded ring of items.
+
+    Refreshes send ``If-None-Match``/``If-Modified-Since`` so an unchanged
+    feed costs a 304, parse the body incrementally and only add items whose
+    guid hasn't been seen. Readers get the last good snapshot in constant
+    time; errors are recorded and the snapshot is kept.
+    """
+
+    def __init__(self, url, refresh_interval=300, max_items=50, timeout=5):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self._ring = deque(maxlen=max_items)
+        self._snapshot = ()
+        self._etag = None
+        self._last_modified = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.refreshed_at = None
+        # Bumped whenever the items change, e.g. to key rendered pages
+        self.version = 0
+        self.last_error = None
+        self.not_modified = 0
+
+    def items(self):
+        return self._snapshot
+
+    def refresh(self):
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+
+        with requests.get(self.url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                self.not_modified += 1
+                self.refreshed_at = time.time()
+                return 0
+            response.raise_for_status()
+            response.raw.decode_content = True
+            fresh = list(iter_items(response.raw))
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        with self._lock:
+            seen = {item["guid"] for item in self._ring}
+            new_items = [item for item in fresh if item["guid"] not in seen]
+            # Feeds list newest first; keep that order at the front of the ring
+            self._ring.extendleft(reversed(new_items))
+            if new_items:
+                self._snapshot = tuple(self._ring)
+                self.version += 1
+            self._etag = etag
+            self._last_modified = last_modified
+            self.refreshed_at = time.time()
+        return len(new_items)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = repr(e)
+            self._stop.wait(self.refresh_interval)
+
+    def start(self):
+        # Every request thread calls this; only one may start the thread
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="news-feed", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {
+            "url": self.url,
+            "items": len(self._snapshot),
+            "refreshed_at": self.refreshed_at,
+            "not_modified": self.not_modified,
+            "last_error": self.last_error,
+        }
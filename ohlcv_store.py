@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from lazy_imports import lazy_import
+from market_data import INTERVAL_MINUTES, OHLCV_COLUMNS, to_utc, utcnow
+from symbols import STOCK_SYMBOLS
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+DEFAULT_ROOT = os.environ.get(
+    "OHLCV_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ohlcv")
+)
+
+# One append-only file per column; "ts" is nanoseconds since the epoch (UTC).
+# dtypes by name so importing the module doesn't import numpy.
+COLUMNS = {
+    "ts": "int64",
+    "Open": "float64",
+    "High": "float64",
+    "Low": "float64",
+    "Close": "float64",
+    "Volume": "float64",
+}
+
+
+class OHLCVStore:
+    """On-disk columnar store of OHLCV bars, one series per (symbol, interval).
+
+    Every column lives in its own raw binary file that is only ever appended
+    to, and ``meta.json`` records how many rows are committed. Readers map
+    the committed prefix with ``np.memmap`` so the web app and the
+    forecasting app share the page cache instead of copying data. Only
+    completed bars are stored, so the store never holds an in-progress bar.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _series_dir(self, symbol, interval):
+        return os.path.join(self.root, interval, symbol)
+
+    def _length(self, series_dir):
+        try:
+            with open(os.path.join(series_dir, "meta.json")) as f:
+                return json.load(f)["length"]
+        except FileNotFoundError:
+            return 0
+
+    @contextmanager
+    def _writer(self, series_dir):
+        os.makedirs(series_dir, exist_ok=True)
+        with self._lock, open(os.path.join(series_dir, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self, symbol, interval, start=None, end=None):
+        """Return ``{column: array}`` views onto the stored series (no copy)."""
+        series_dir = self._series_dir(symbol, interval)
+        length = self._length(series_dir)
+        if length == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+        arrays = {
+            name: np.memmap(os.path.join(series_dir, f"{name}.bin"), dtype=dtype, mode="r", shape=(length,))
+            for name, dtype in COLUMNS.items()
+        }
+        ts = arrays["ts"]
+        lo = 0 if start is None else np.searchsorted(ts, to_utc(start).value, side="left")
+        hi = length if end is None else np.searchsorted(ts, to_utc(end).value, side="left")
+        return {name: array[lo:hi] for name, array in arrays.items()}
+
+    def read_frame(self, symbol, interval, start=None, end=None):
+        arrays = self.read(symbol, interval, start, end)
+        index = pd.DatetimeIndex(arrays["ts"].astype("datetime64[ns]"), name="Date" if interval == "1d" else "Datetime")
+        return pd.DataFrame({name: arrays[name] for name in OHLCV_COLUMNS}, index=index)
+
+    def last_timestamp(self, symbol, interval):
+        ts = self.read(symbol, interval)["ts"]
+        if len(ts) == 0:
+            return None
+        return pd.Timestamp(int(ts[-1]))
+
+    def append(self, symbol, interval, data):
+        """Append the rows of ``data`` newer than the last stored bar."""
+        if data.empty:
+            return 0
+        index = pd.DatetimeIndex(data.index)
+        if index.tz is not None:
+            index = index.tz_convert(None)
+        ts = index.as_unit("ns").asi8
+
+        series_dir = self._series_dir(symbol, interval)
+        with self._writer(series_dir):
+            length = self._length(series_dir)
+            if length:
+                last = np.memmap(os.path.join(series_dir, "ts.bin"), dtype=np.int64, mode="r", shape=(length,))[-1]
+                keep = ts > last
+            else:
+                keep = np.ones(len(ts), dtype=bool)
+            if not keep.any():
+                return 0
+
+            columns = {"ts": ts[keep]}
+            for name in OHLCV_COLUMNS:
+                columns[name] = data[name].to_numpy()[keep]
+
+            for name, dtype in COLUMNS.items():
+                path = os.path.join(series_dir, f"{name}.bin")
+                with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                    # Drop any tail left behind by an interrupted append
+                    f.truncate(length * np.dtype(dtype).itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+            # Committing the new length makes the rows visible to readers
+            added = int(keep.sum())
+            tmp_path = os.path.join(series_dir, "meta.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"symbol": symbol, "interval": interval, "length": length + added}, f)
+            os.replace(tmp_path, os.path.join(series_dir, "meta.json"))
+            return added
+
+    def update(self, provider, symbols, interval, start, end=None):
+        """Fetch only bars newer than what is stored and append them.
+
+        Symbols that need the same start are fetched in one batched call.
+        Returns ``{symbol: rows appended}``.
+        """
+        end = to_utc(end or utcnow())
+        start = to_utc(start)
+        step = pd.Timedelta(minutes=INTERVAL_MINUTES[interval])
+
+        groups = {}
+        for symbol in symbols:
+            last = self.last_timestamp(symbol, interval)
+            fetch_from = start if last is None else max(start, last + step)
+            # Nothing to do until the next bar has closed
+            if fetch_from + step > end:
+                continue
+            groups.setdefault(fetch_from, []).append(symbol)
+
+        appended = {}
+        for fetch_from, group in groups.items():
+            bars = provider.fetch_ohlcv(group, fetch_from.to_pydatetime(), end.to_pydatetime(), interval)
+            for symbol, data in bars.items():
+                index = pd.DatetimeIndex(data.index)
+                if index.tz is not None:
+                    index = index.tz_convert(None)
+                appended[symbol] = self.append(symbol, interval, data[index + step <= end])
+        return appended
+
+
+def main():
+    from market_data import get_provider
+
+    parser = argparse.ArgumentParser(description="Incrementally update the local OHLCV store.")
+    parser.add_argument("symbols", nargs="*", help="defaults to the web app's STOCK_SYMBOLS")
+    parser.add_argument("--interval", default="1d", choices=sorted(INTERVAL_MINUTES))
+    parser.add_argument("--start", default="2019-01-01")
+    parser.add_argument("--provider", default=None, help="yfinance or fake")
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if not symbols:
+        symbols = STOCK_SYMBOLS
+
+    store = OHLCVStore(args.root)
+    appended = store.update(get_provider(args.provider), symbols, args.interval, args.start)
+    for symbol in symbols:
+        print(f"{symbol}: +{appended.get(symbol, 0)} bars, last {store.last_timestamp(symbol, args.interval)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import random
+import time
+from collections import namedtuple
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+OrderResult = namedtuple("OrderResult", "ok message funds quantity price")
+
+# Busy-lock retries on top of SQLite's own busy_timeout wait
+MAX_RETRIES = 8
+
+_DEBIT_FUNDS = text('UPDATE "user" SET funds = funds - :amount WHERE id = :user_id AND funds >= :amount')
+_CREDIT_FUNDS = text('UPDATE "user" SET funds = funds + :amount WHERE id = :user_id')
+_ADD_SHARES = text(
+    "INSERT INTO holding (user_id, stock_symbol, quantity, cost_basis) "
+    "VALUES (:user_id, :symbol, :quantity, :cost) "
+    "ON CONFLICT (user_id, stock_symbol) DO UPDATE SET "
+    "quantity = quantity + excluded.quantity, cost_basis = cost_basis + excluded.cost_basis"
+)
+_REMOVE_SHARES = text(
+    "UPDATE holding SET quantity = quantity - :quantity "
+    "WHERE user_id = :user_id AND stock_symbol = :symbol AND quantity >= :quantity"
+)
+# FIFO cost basis, as in valuation.fifo_positions: sells always take the
+# oldest lots, so the open shares are the last `quantity` shares bought
+_FIFO_COST = text(
+    "UPDATE holding SET cost_basis = ("
+    "SELECT COALESCE(SUM(b.price * MAX(0, MIN(b.quantity, holding.quantity - b.newer))), 0.0) FROM ("
+    "SELECT price, quantity, SUM(quantity) OVER (ORDER BY id DESC) - quantity AS newer FROM stock_transaction "
+    "WHERE user_id = :user_id AND stock_symbol = :symbol AND transaction_type = 'BUY') b) "
+    "WHERE user_id = :user_id AND stock_symbol = :symbol"
+)
+_RECORD_FILL = text(
+    "INSERT INTO stock_transaction (stock_symbol, quantity, price, transaction_type, user_id) "
+    "VALUES (:symbol, :quantity, :price, :side, :user_id)"
+)
+_LOCK_FUNDS = text('SELECT funds FROM "user" WHERE id = :user_id')
+_SET_FUNDS = text('UPDATE "user" SET funds = :funds WHERE id = :user_id')
+_USER_HOLDINGS = text("SELECT stock_symbol, quantity, cost_basis FROM holding WHERE user_id = :user_id")
+_SET_HOLDING = text(
+    "INSERT INTO holding (user_id, stock_symbol, quantity, cost_basis) "
+    "VALUES (:user_id, :symbol, :quantity, :cost) "
+    "ON CONFLICT (user_id, stock_symbol) DO UPDATE SET "
+    "quantity = excluded.quantity, cost_basis = excluded.cost_basis"
+)
+_POSITION = text(
+    'SELECT u.funds, COALESCE(h.quantity, 0) FROM "user" u '
+    "LEFT JOIN holding h ON h.user_id = u.id AND h.stock_symbol = :symbol "
+    "WHERE u.id = :user_id"
+)
+
+
+class OrderRejected(Exception):
+    pass
+
+
+def configure_sqlite(engine, busy_timeout=5000):
+    """Put a SQLite engine in WAL mode and let callers ask for BEGIN IMMEDIATE.
+
+    pysqlite's own transaction handling is switched off so that SQLAlchemy
+    emits BEGIN itself; connections with the ``sqlite_immediate`` execution
+    option take the write lock up front with BEGIN IMMEDIATE.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout)}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        if conn.get_execution_options().get("sqlite_immediate"):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql("BEGIN")
+
+
+def apply_order(conn, user_id, symbol, side, quantity, price):
+    """Apply one order inside an open transaction; raises OrderRejected."""
+    amount = price * quantity
+    params = {"user_id": user_id, "symbol": symbol, "quantity": quantity, "price": price, "amount": amount}
+    if side == "BUY":
+        if conn.execute(_DEBIT_FUNDS, params).rowcount != 1:
+            raise OrderRejected("Insufficient funds.")
+        conn.execute(_ADD_SHARES, dict(params, cost=amount))
+    elif side == "SELL":
+        if conn.execute(_REMOVE_SHARES, params).rowcount != 1:
+            raise OrderRejected("Insufficient stock quantity.")
+        conn.execute(_FIFO_COST, params)
+        conn.execute(_CREDIT_FUNDS, params)
+    else:
+        raise OrderRejected(f"Unknown order side '{side}'.")
+    conn.execute(_RECORD_FILL, dict(params, side=side))
+
+
+def run_immediate(engine, work, retries=MAX_RETRIES):
+    """Run ``work(conn)`` in a BEGIN IMMEDIATE transaction, retrying on busy."""
+    for attempt in range(retries + 1):
+        try:
+            with engine.connect().execution_options(sqlite_immediate=True) as conn:
+                with conn.begin():
+                    return work(conn)
+        except OperationalError as e:
+            if ("locked" not in str(e) and "busy" not in str(e)) or attempt == retries:
+                raise
+            time.sleep(min(0.5, 0.005 * 2 ** attempt) * random.random())
+
+
+def get_position(engine, user_id, symbol):
+    """Return ``(funds, shares)`` for a user and symbol."""
+    with engine.connect() as conn:
+        row = conn.execute(_POSITION, {"user_id": user_id, "symbol": symbol}).first()
+    return row if row is not None else (0.0, 0)
+
+
+def settle_fills(engine, fills):
+    """Write matched fills (buyer and seller side) in one transaction."""
+
+    def work(conn):
+        for fill in fills:
+            apply_order(conn, fill.buyer_id, fill.symbol, "BUY", fill.quantity, fill.price)
+            apply_order(conn, fill.seller_id, fill.symbol, "SELL", fill.quantity, fill.price)
+
+    run_immediate(engine, work)
+
+
+def execute_order(engine, user_id, symbol, side, quantity, price):
+    """Execute a market order atomically and return an ``OrderResult``.
+
+    Funds and shares are checked and moved with single conditional UPDATEs,
+    so concurrent orders from any number of workers can neither overdraw an
+    account nor sell shares that aren't there.
+    """
+    if quantity <= 0 or price <= 0:
+        return OrderResult(False, "Quantity and price must be positive.", None, None, price)
+
+    def work(conn):
+        # Rejections happen on the first conditional UPDATE, before any write
+        try:
+            apply_order(conn, user_id, symbol, side, quantity, price)
+            ok, message = True, "Stock bought successfully!" if side == "BUY" else "Stock sold successfully!"
+        except OrderRejected as e:
+            ok, message = False, str(e)
+        row = conn.execute(_POSITION, {"user_id": user_id, "symbol": symbol}).first()
+        funds, position = row if row is not None else (None, 0)
+        return OrderResult(ok, message, funds, position, price)
+
+    return run_immediate(engine, work)
+
+
+def parse_order(raw):
+    """Validate one order dict from a JSON payload; raises OrderRejected."""
+    if not isinstance(raw, dict):
+        raise OrderRejected("Order must be an object.")
+    symbol = raw.get("symbol")
+    side = str(raw.get("side", "")).upper()
+    if not isinstance(symbol, str) or not 0 < len(symbol) <= 10:
+        raise OrderRejected("Invalid symbol.")
+    if side not in ("BUY", "SELL"):
+        raise OrderRejected("Side must be BUY or SELL.")
+    try:
+        quantity = int(raw.get("quantity"))
+        price = float(raw.get("price"))
+    except (TypeError, ValueError):
+        raise OrderRejected("Quantity and price must be numbers.") from None
+    if quantity <= 0 or not price > 0:
+        raise OrderRejected("Quantity and price must be positive.")
+    return symbol, side, quantity, price
+
+
+def execute_batch(engine, user_id, batch):
+    """Execute a list of raw orders for one user in a single transaction.
+
+    Orders are validated in sequence against the user's funds and holdings
+    held in memory (the write lock is taken up front), then every accepted
+    fill is written with one executemany per table. Returns
+    ``(results, funds, positions)`` where ``results`` has one
+    ``{"index", "ok", "message"}`` dict per order.
+    """
+
+    def work(conn):
+        funds = conn.execute(_LOCK_FUNDS, {"user_id": user_id}).scalar()
+        if funds is None:
+            raise OrderRejected("Unknown user.")
+        positions = {
+            symbol: [quantity, cost_basis]
+            for symbol, quantity, cost_basis in conn.execute(_USER_HOLDINGS, {"user_id": user_id})
+        }
+
+        results = []
+        fills = []
+        touched = set()
+        sold = set()
+        for index, raw in enumerate(batch):
+            try:
+                symbol, side, quantity, price = parse_order(raw)
+                amount = price * quantity
+                position = positions.setdefault(symbol, [0, 0.0])
+                if side == "BUY":
+                    if funds < amount:
+                        raise OrderRejected("Insufficient funds.")
+                    funds -= amount
+                    position[0] += quantity
+                    position[1] += amount
+                else:
+                    if position[0] < quantity:
+                        raise OrderRejected("Insufficient stock quantity.")
+                    funds += amount
+                    position[0] -= quantity
+                    sold.add(symbol)
+            except OrderRejected as e:
+                results.append({"index": index, "ok": False, "message": str(e)})
+                continue
+            touched.add(symbol)
+            fills.append({"user_id": user_id, "symbol": symbol, "quantity": quantity, "price": price, "side": side})
+            results.append({"index": index, "ok": True, "message": "Filled."})
+
+        if fills:
+            conn.execute(_SET_FUNDS, {"user_id": user_id, "funds": funds})
+            conn.execute(_RECORD_FILL, fills)
+            conn.execute(
+                _SET_HOLDING,
+                [
+                    {"user_id": user_id, "symbol": symbol, "quantity": positions[symbol][0], "cost": positions[symbol][1]}
+                    for symbol in touched
+                ],
+            )
+            if sold:
+                # Bases of sold positions come from the ledger, now with this batch's buys
+                conn.execute(_FIFO_COST, [{"user_id": user_id, "symbol": symbol} for symbol in sold])
+        return results, funds, {symbol: positions[symbol][0] for symbol in touched}
+
+    return run_immediate(engine, work)
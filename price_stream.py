@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+
+
+class StreamFull(Exception):
+    pass
+
+
+class Subscription:
+    """One client's bounded event queue.
+
+    When the client falls behind, the oldest events are dropped: for price
+    ticks only the latest one matters.
+    """
+
+    def __init__(self, symbol, size):
+        self.symbol = symbol
+        self.dropped = 0
+        self._events = deque(maxlen=size)
+        self._ready = threading.Condition()
+
+    def put(self, event):
+        with self._ready:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within ``timeout`` seconds."""
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+
+class PriceStream:
+    """Fan-out of per-symbol updates to any number of subscribers.
+
+    A symbol gets a single poller thread while it has subscribers; every
+    ``interval`` seconds it calls ``poll(symbol, last)`` (``last`` being the
+    previous event or None) and publishes the returned event, if any, to
+    every subscriber's queue. Upstream load depends on the number of watched
+    symbols, not on the number of viewers.
+
+    Every open stream holds a server thread, so past ``max_subscribers``
+    streams ``subscribe`` raises ``StreamFull``.
+    """
+
+    def __init__(self, poll, interval=2, queue_size=16, max_subscribers=None):
+        self.poll = poll
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = {}  # symbol -> set of Subscription
+        self._last = {}  # symbol -> latest event, replayed to new subscribers
+        self._pollers = {}
+        self._count = 0
+        self.rejected = 0
+        self.errors = {}
+
+    def subscribe(self, symbol):
+        subscription = Subscription(symbol, self.queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and self._count >= self.max_subscribers:
+                self.rejected += 1
+                raise StreamFull("Too many open price streams.")
+            self._count += 1
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            last = self._last.get(symbol)
+            if symbol not in self._pollers:
+                poller = threading.Thread(target=self._run, args=(symbol,), name=f"price-stream-{symbol}", daemon=True)
+                self._pollers[symbol] = poller
+                poller.start()
+        if last is not None:
+            subscription.put(last)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.symbol)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+
+    def _run(self, symbol):
+        while True:
+            with self._lock:
+                if not self._subscribers.get(symbol):
+                    # Last viewer left; the next subscribe starts a new poller
+                    self._subscribers.pop(symbol, None)
+                    self._last.pop(symbol, None)
+                    del self._pollers[symbol]
+                    return
+                last = self._last.get(symbol)
+
+            try:
+                event = self.poll(symbol, last)
+                self.errors.pop(symbol, None)
+            except Exception as e:
+                event = None
+                self.errors[symbol] = repr(e)
+
+            if event is not None:
+                with self._lock:
+                    self._last[symbol] = event
+                    subscribers = list(self._subscribers.get(symbol, ()))
+                for subscription in subscribers:
+                    subscription.put(event)
+            time.sleep(self.interval)
+
+    def status(self):
+        with self._lock:
+            return {
+                "symbols": {
+                    symbol: {
+                        "subscribers": len(subscribers),
+                        "dropped": sum(subscription.dropped for subscription in subscribers),
+                        "last_error": self.errors.get(symbol),
+                    }
+                    for symbol, subscribers in self._subscribers.items()
+                },
+                "pollers": len(self._pollers),
+                "subscribers": self._count,
+                "max_subscribers": self.max_subscribers,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value, fetched_at):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class QuoteCache:
+    """Bounded TTL cache for upstream market data.
+
+    Concurrent lookups for the same key share a single in-flight fetch. If the
+    fetch fails or takes longer than ``fetch_timeout`` seconds, the last good
+    value is served (flagged as stale) as long as it is younger than
+    ``max_stale`` seconds.
+    """
+
+    def __init__(self, ttl=15, max_size=256, max_stale=900, fetch_timeout=5, workers=4):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_stale = max_stale
+        self.fetch_timeout = fetch_timeout
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-fetch")
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.errors = 0
+
+    def get(self, key, fetch):
+        """Return ``(value, stale)`` for ``key``, calling ``fetch()`` on a miss."""
+        now = time.monotonic()
+        leader = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.fetched_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value, False
+            self.misses += 1
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._executor.submit(fetch)
+                self._inflight[key] = future
+                leader = True
+        if leader:
+            future.add_done_callback(lambda f: self._store(key, f))
+
+        try:
+            return future.result(timeout=self.fetch_timeout), False
+        except Exception:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() - entry.fetched_at < self.max_stale:
+                    self.stale_hits += 1
+                    return entry.value, True
+            raise
+
+    def peek(self, key, default=None):
+        """Return the fresh cached value for ``key`` without fetching."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.fetched_at >= self.ttl:
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = _Entry(value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _store(self, key, future):
+        with self._lock:
+            current = self._inflight.get(key) is future
+            if current:
+                del self._inflight[key]
+            if future.exception() is not None:
+                self.errors += 1
+                return
+            if not current:
+                return  # invalidated mid-fetch; the value may predate the change
+            self._entries[key] = _Entry(future.result(), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        # In-flight fetches are dropped too: lookups already waiting still get
+        # their result, but it isn't cached and new lookups fetch again
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._inflight.clear()
+            else:
+                self._entries.pop(key, None)
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "errors": self.errors,
+                "inflight": len(self._inflight),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
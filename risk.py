@@ -0,0 +1,204 @@
+"""Monte Carlo value at risk for stock portfolios.
+
+Daily log returns of the held symbols give a mean vector and covariance
+matrix. Correlated return paths are drawn as ``mu + Z @ L.T`` (``L`` the
+Cholesky factor of the covariance) for a whole ``paths x horizon x assets``
+block of normals at once, in chunks of at most ``chunk_bytes`` so memory stays
+bounded however many paths are asked for. Chunks can be spread over a process
+pool; every chunk gets its own seed from one ``SeedSequence``, so the result
+is the same for any number of workers.
+
+    python risk.py AAPL=10000 MSFT=5000 --paths 100000 --horizon 10
+"""
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import lazy_import
+import market_data
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# The store only appends bars newer than its last one, so the shared daily
+# series is seeded from the same start as the forecasting and backtest tools
+START = "2019-01-01"
+LEVELS = (0.95, 0.99)
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+# Trading days of returns the distribution is estimated from
+LOOKBACK_DAYS = 756
+MIN_OBSERVATIONS = 60
+CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def load_closes(symbols, provider, store=None, lookback_days=LOOKBACK_DAYS, end=None):
+    """Daily closes as one column per symbol, indexed by date.
+
+    Reads the shared OHLCV store (the same daily bars the forecasting app
+    uses), topped up from ``provider``; without a store, fetches directly.
+    """
+    end = end or market_data.utcnow()
+    # Calendar days covering the trading-day lookback, plus some slack
+    start = end - datetime.timedelta(days=int(lookback_days * 1.5) + 10)
+    if store is not None:
+        try:
+            store.update(provider, symbols, "1d", min(start, datetime.datetime.fromisoformat(START)), end)
+        except Exception:
+            pass  # use whatever is stored
+        frames = {symbol: store.read_frame(symbol, "1d", start=start) for symbol in symbols}
+    else:
+        frames = provider.fetch_ohlcv(symbols, start, end, "1d")
+    closes = {symbol: frame["Close"] for symbol, frame in frames.items() if not frame.empty}
+    return pd.DataFrame(closes).sort_index().tail(lookback_days + 1)
+
+
+def log_returns(closes, min_observations=MIN_OBSERVATIONS):
+    """Date-aligned daily log returns; symbols with too little history are dropped."""
+    closes = closes.loc[:, closes.notna().sum() > min_observations]
+    returns = np.log(closes.dropna()).diff().iloc[1:]
+    if len(returns) < min_observations:
+        return returns.iloc[:, :0]
+    return returns
+
+
+def cholesky(cov):
+    """Lower-triangular ``L`` with ``L @ L.T == cov``, tolerating singular ``cov``.
+
+    Perfectly correlated or constant series make the covariance only
+    semi-definite; those fall back to an eigendecomposition square root.
+    """
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        w, v = np.linalg.eigh(cov)
+        return v * np.sqrt(np.clip(w, 0.0, None))
+
+
+def _simulate_chunk(mu, chol, values, horizon, paths, seed):
+    """P&L at the horizon and maximum drawdown of ``paths`` simulated paths."""
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_normal((paths, horizon, len(mu)))
+    returns = returns @ chol.T
+    returns += mu
+    np.cumsum(returns, axis=1, out=returns)
+    np.exp(returns, out=returns)
+    path_values = returns @ values  # (paths, horizon)
+    start = values.sum()
+    peaks = np.maximum(np.maximum.accumulate(path_values, axis=1), start)
+    drawdown = (1.0 - path_values / peaks).max(axis=1)
+    return path_values[:, -1] - start, drawdown
+
+
+def simulate(mu, cov, values, paths=100_000, horizon=10, seed=0, chunk_bytes=CHUNK_BYTES, workers=None):
+    """``(pnl, max_drawdown)`` arrays over ``paths`` correlated return paths.
+
+    ``values`` are the current market values per asset. Runs in-process
+    unless ``workers`` is more than one.
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    chol = cholesky(np.asarray(cov, dtype=np.float64))
+    values = np.asarray(values, dtype=np.float64)
+    chunk = max(1, chunk_bytes // (horizon * len(mu) * 8))
+    sizes = [min(chunk, paths - start) for start in range(0, paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers is not None and workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_simulate_chunk, mu, chol, values, horizon, size, s) for size, s in zip(sizes, seeds)
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [_simulate_chunk(mu, chol, values, horizon, size, s) for size, s in zip(sizes, seeds)]
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def summarize(pnl, drawdown, value, levels=LEVELS):
+    """VaR/CVaR at each confidence level (positive numbers are losses) and
+    the P&L and drawdown percentiles."""
+    summary = {"value": float(value), "paths": len(pnl), "var": {}, "cvar": {}}
+    for level in levels:
+        var = -float(np.quantile(pnl, 1 - level))
+        tail = pnl[pnl <= -var]
+        key = f"{level * 100:g}"
+        summary["var"][key] = var
+        summary["cvar"][key] = -float(tail.mean()) if len(tail) else var
+    summary["pnl_percentiles"] = dict(zip((str(p) for p in PERCENTILES), np.percentile(pnl, PERCENTILES).tolist()))
+    summary["drawdown_percentiles"] = dict(
+        zip((str(p) for p in PERCENTILES), np.percentile(drawdown, PERCENTILES).tolist())
+    )
+    summary["mean_pnl"] = float(pnl.mean())
+    return summary
+
+
+def portfolio_risk(positions, closes, paths=100_000, horizon=10, levels=LEVELS, seed=0, workers=None,
+                   chunk_bytes=CHUNK_BYTES):
+    """Simulate a portfolio of ``{symbol: market value}`` from daily ``closes``.
+
+    Positions without enough price history are left out of the simulation
+    and listed under ``unmodeled``.
+    """
+    positions = {symbol: value for symbol, value in positions.items() if value}
+    returns = log_returns(closes[[s for s in positions if s in closes.columns]])
+    symbols = list(returns.columns)
+    unmodeled = sorted(set(positions) - set(symbols))
+    values = np.array([positions[symbol] for symbol in symbols], dtype=np.float64)
+    if not symbols:
+        return {"symbols": [], "unmodeled": unmodeled, "value": 0.0, "paths": 0, "horizon": horizon}
+
+    matrix = returns.to_numpy(dtype=np.float64)
+    mu = matrix.mean(axis=0)
+    cov = np.atleast_2d(np.cov(matrix, rowvar=False))
+    pnl, drawdown = simulate(mu, cov, values, paths, horizon, seed, chunk_bytes, workers)
+    summary = summarize(pnl, drawdown, values.sum(), levels)
+    summary.update(
+        symbols=symbols,
+        unmodeled=unmodeled,
+        horizon=horizon,
+        observations=len(returns),
+        as_of=returns.index[-1].strftime("%Y-%m-%d"),
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("positions", nargs="+", help="SYMBOL=market value")
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--horizon", type=int, default=10, help="trading days")
+    parser.add_argument("--lookback", type=int, default=LOOKBACK_DAYS, help="trading days of history")
+    parser.add_argument("--provider", default=None, help="yfinance or fake")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from ohlcv_store import OHLCVStore
+
+    positions = {}
+    for spec in args.positions:
+        symbol, _, value = spec.partition("=")
+        positions[symbol.upper()] = float(value)
+
+    provider = market_data.get_provider(args.provider or os.environ.get("MARKET_DATA_PROVIDER"))
+    closes = load_closes(list(positions), provider, OHLCVStore(), args.lookback)
+    started = time.time()
+    summary = portfolio_risk(positions, closes, args.paths, args.horizon, seed=args.seed, workers=args.workers)
+    elapsed = time.time() - started
+    if not summary["symbols"]:
+        raise SystemExit("Not enough price history for any of the positions.")
+
+    print(f"Portfolio ${summary['value']:,.2f}, {summary['horizon']}-day horizon, {summary['observations']} "
+          f"daily returns to {summary['as_of']}")
+    for level in summary["var"]:
+        print(f"  VaR {level}%: ${summary['var'][level]:,.2f}   CVaR {level}%: ${summary['cvar'][level]:,.2f}")
+    drawdowns = summary["drawdown_percentiles"]
+    print(f"  max drawdown: median {drawdowns['50']:.2%}, 95th percentile {drawdowns['95']:.2%}")
+    if summary["unmodeled"]:
+        print(f"  not modeled (no history): {', '.join(summary['unmodeled'])}")
+    print(f"{summary['paths']} paths in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""The app's stock universe.
+
+Kept apart from ``app`` so the command line tools and benchmarks can read it
+without building the web app.
+"""
+
+# Predefined list of stock symbols for the dropdown
+STOCK_SYMBOLS = [
+    "AAPL",
+    "MSFT",
+    "GOOGL",
+    "AMZN",
+    "FB",
+    "TSLA",
+    "BRK-A",
+    "JNJ",
+    "V",
+    "WMT",
+    "JPM",
+    "MA",
+    "PG",
+    "UNH",
+    "NVDA",
+    "HD",
+    "DIS",
+    "PYPL",
+    "VZ",
+    "ADBE",
+]
@@ -0,0 +1,106 @@
+from sqlalchemy import text
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+_TRANSACTIONS = (
+    "SELECT id, user_id, stock_symbol AS symbol, transaction_type AS side, quantity, price "
+    "FROM stock_transaction"
+)
+
+POSITION_COLUMNS = ["quantity", "cost", "realized"]
+
+
+def load_transactions(engine, user_id=None):
+    """Transactions in execution order, for one user or everyone."""
+    sql = _TRANSACTIONS
+    params = {}
+    if user_id is not None:
+        sql += " WHERE user_id = :user_id"
+        params["user_id"] = user_id
+    with engine.connect() as conn:
+        return pd.read_sql(text(sql + " ORDER BY id"), conn, params=params)
+
+
+def fifo_positions(transactions):
+    """Open quantity, FIFO cost of the open lots and realized P&L per position.
+
+    Returns a frame indexed by (user_id, symbol). Orders never sell more than
+    is held, so under FIFO the shares sold from a position are always its
+    first ``total sold`` bought shares. Their cost is read off the cumulative
+    (quantity, cost) curve of the buys with one ``np.interp`` for every
+    position at once, instead of walking lots sell by sell.
+    """
+    if transactions.empty:
+        index = pd.MultiIndex.from_arrays([[], []], names=["user_id", "symbol"])
+        return pd.DataFrame(columns=POSITION_COLUMNS, index=index, dtype=float)
+
+    frame = transactions.sort_values("id", kind="stable")
+    keys, key_index = pd.MultiIndex.from_frame(frame[["user_id", "symbol"]]).factorize()
+    quantity = frame["quantity"].to_numpy(dtype=np.float64)
+    amount = quantity * frame["price"].to_numpy(dtype=np.float64)
+    is_buy = (frame["side"] == "BUY").to_numpy()
+    n = len(key_index)
+
+    bought = np.bincount(keys[is_buy], quantity[is_buy], minlength=n)
+    bought_cost = np.bincount(keys[is_buy], amount[is_buy], minlength=n)
+    sold = np.bincount(keys[~is_buy], quantity[~is_buy], minlength=n)
+    proceeds = np.bincount(keys[~is_buy], amount[~is_buy], minlength=n)
+
+    # Buys grouped by position, in execution order within each group
+    order = np.argsort(keys[is_buy], kind="stable")
+    buy_keys = keys[is_buy][order]
+    cum_quantity = np.concatenate(([0.0], np.cumsum(quantity[is_buy][order])))
+    cum_cost = np.concatenate(([0.0], np.cumsum(amount[is_buy][order])))
+    starts = np.searchsorted(buy_keys, np.arange(n))
+    sold_cost = (
+        np.interp(cum_quantity[starts] + np.minimum(sold, bought), cum_quantity, cum_cost) - cum_cost[starts]
+    )
+
+    positions = pd.DataFrame(
+        {"quantity": bought - sold, "cost": bought_cost - sold_cost, "realized": proceeds - sold_cost},
+        index=key_index.set_names(["user_id", "symbol"]),
+    )
+    positions["quantity"] = positions["quantity"].round().astype(np.int64)
+    return positions
+
+
+def mark_to_market(positions, prices):
+    """Add price, market value and unrealized P&L using ``prices[symbol]``.
+
+    Symbols without a price are carried at cost (zero unrealized P&L) and
+    flagged with ``priced=False``.
+    """
+    symbols = positions.index.get_level_values("symbol")
+    marks = symbols.map(lambda symbol: prices.get(symbol, np.nan)).to_numpy(dtype=np.float64)
+    quantity = positions["quantity"].to_numpy(dtype=np.float64)
+    cost = positions["cost"].to_numpy(dtype=np.float64)
+    priced = ~np.isnan(marks)
+    market_value = np.where(priced, quantity * marks, cost)
+
+    valued = positions.copy()
+    valued["price"] = marks
+    valued["priced"] = priced
+    valued["market_value"] = market_value
+    valued["unrealized"] = market_value - cost
+    return valued
+
+
+def summarize(valued, funds):
+    """Per-user totals; ``funds`` maps user_id to cash. Sorted by equity."""
+    totals = valued.groupby(level="user_id")[["market_value", "cost", "unrealized", "realized"]].sum()
+    totals = totals.reindex(pd.Index(list(funds), name="user_id"), fill_value=0.0)
+    totals["funds"] = pd.Series(funds, dtype=np.float64)
+    totals["equity"] = totals["funds"] + totals["market_value"]
+    return totals.sort_values("equity", ascending=False)
+
+
+def open_positions(valued, user_id):
+    """``{symbol: row dict}`` for one user's nonzero positions."""
+    if user_id not in valued.index.get_level_values("user_id"):
+        return {}
+    rows = valued.xs(user_id, level="user_id")
+    rows = rows[rows["quantity"] != 0]
+    return {symbol: row._asdict() for symbol, row in zip(rows.index, rows.itertuples(index=False))}